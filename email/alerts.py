@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from dedup import index as dedup_index, text_hash
+from email_sender import deliver_email
+from fanout import failed_recipients
+from outbox import outbox
+from renderer import Template
+
+# Sends run on their own small pool so an alert never waits for polling or the digest
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alert")
+
+# Tweet IDs / text hashes already alerted, so a retweet under another account is not alerted twice
+_alerted = OrderedDict()
+_alerted_lock = threading.Lock()
+MAX_ALERTED = 1000
+
+def alerts_enabled():
+    return bool(config.ALERT_USERS or config.ALERT_KEYWORDS)
+
+def matches_alert_rules(user, tweet):
+    """
+    Whether a tweet deserves an immediate alert: it comes from a priority account
+    (ALERT_USERS) or its text contains one of ALERT_KEYWORDS (case-insensitive).
+    """
+    if user in config.ALERT_USERS:
+        return True
+    text = (tweet.get("text") or "").lower()
+    return any(keyword.lower() in text for keyword in config.ALERT_KEYWORDS)
+
+def _claim(tweet):
+    # Alerts go out before the digest's dedup filter: skip tweets it already knows
+    # (emitted or buffered), which also covers alerts sent before a restart
+    if dedup_index.is_known(tweet):
+        return False
+    keys = [tweet["id"], text_hash(tweet.get("text"))]
+    with _alerted_lock:
+        if any(key in _alerted for key in keys if key):
+            return False
+        for key in keys:
+            if key:
+                _alerted[key] = True
+        while len(_alerted) > MAX_ALERTED:
+            _alerted.popitem(last=False)
+    return True
+
+ALERT_TEMPLATE = Template(
+    "<h2 style='margin-bottom: 10px; color: #e0245e;'>⚡ {author}</h2>"
+    "<p style='font-size: 16px; line-height: 1.5;'>{text:br}</p>"
+    "<p style='color: #888;'>检测时间: {checked_at} · 图片将随汇总邮件发送</p>"
+    "<p><a href='{link}' style='color: #888; text-decoration: none;'>🔗 查看原推</a></p>"
+)
+
+def build_alert(tweet):
+    """
+    Text-only alert email: no images to download or attach, so it can go out right away.
+    """
+    author = tweet.get("author", "")
+    headline = " ".join((tweet.get("text") or "").split())[:60]
+    subject = f"⚡ {author}: {headline}"
+    body = ALERT_TEMPLATE.render(
+        author=author,
+        text=tweet.get("text", ""),
+        checked_at=time.strftime('%Y-%m-%d %H:%M:%S'),
+        link=tweet['link'],
+    )
+    return subject, body
+
+def send_alert(tweet):
+    subject, body = build_alert(tweet)
+    results = deliver_email(subject, body, provider='resend')
+    failed = failed_recipients(results)
+    if results and not failed:
+        logging.info(f"Alert sent for tweet {tweet['id']} from {tweet.get('author')}.")
+        return True
+    # Do not drop it: the outbox keeps retrying in the background, only for those who missed it
+    logging.error(f"Failed to send alert for tweet {tweet['id']} to {len(failed)} recipient(s), queueing it in the outbox.")
+    outbox.enqueue(subject, body, provider='resend', recipients=failed or None)
+    return False
+
+def dispatch_alerts(user, tweets):
+    """
+    Send an immediate alert for each tweet of `user` matching the alert rules, in the
+    background. The tweets still go into the normal digest, with their images.
+    The latest tweet returned on an account's first run is not news and is skipped.
+    Returns the number of alerts queued.
+    """
+    if not alerts_enabled():
+        return 0
+    queued = 0
+    for tweet in tweets:
+        if tweet.get("first_run"):
+            continue
+        if matches_alert_rules(user, tweet) and _claim(tweet):
+            tweet["alerted"] = True
+            _executor.submit(send_alert, tweet)
+            queued += 1
+    if queued:
+        logging.info(f"Queued {queued} immediate alerts for {user}.")
+    return queued
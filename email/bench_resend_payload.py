@@ -0,0 +1,55 @@
+"""
+Compare peak memory and time of the old Resend attachment encoding (list of ints)
+with the base64 payload built by mail_message.MailMessage.
+
+Usage: python bench_resend_payload.py [total_mb] [files]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mail_message import MailMessage
+
+def legacy_attachments(paths):
+    result = []
+    for file_path in paths:
+        with open(file_path, "rb") as f:
+            file_content = f.read()
+            result.append({"filename": os.path.basename(file_path), "content": list(file_content)})
+    return result
+
+def base64_attachments(paths):
+    with MailMessage("bench", "", attachments=paths) as message:
+        return message.to_resend("bench@example.com", "bench@example.com")["attachments"]
+
+def measure(label, build, paths):
+    tracemalloc.start()
+    start = time.perf_counter()
+    payload = json.dumps({"attachments": build(paths)})
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} peak {peak / 1024 / 1024:8.1f} MB  payload {len(payload) / 1024 / 1024:6.1f} MB  {elapsed:6.2f}s")
+
+def main():
+    total_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    size = int(total_mb * 1024 * 1024 / files)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            path = os.path.join(tmp, f"image_{i}.jpg")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            paths.append(path)
+        print(f"{files} attachments x {size / 1024:.0f} KB")
+        measure("list", legacy_attachments, paths)
+        measure("base64", base64_attachments, paths)
+
+if __name__ == "__main__":
+    main()
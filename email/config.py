@@ -10,6 +10,15 @@ QQ_EMAIL = os.getenv("QQ_EMAIL")
 QQ_EMAIL_PASSWORD = os.getenv("QQ_EMAIL_PASSWORD") # This should be the authorization code (授权码), not the login password
 RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL", QQ_EMAIL) # Default to sending to self
 
+# Subscribers: RECEIVER_EMAILS (comma separated) plus one address per line in
+# SUBSCRIBERS_FILE; falls back to RECEIVER_EMAIL. Each email is rendered once and
+# fanned out with FANOUT_WORKERS concurrent sends, paced per provider (sends/second).
+RECEIVER_EMAILS = [e.strip() for e in os.getenv("RECEIVER_EMAILS", "").split(",") if e.strip()] or ([RECEIVER_EMAIL] if RECEIVER_EMAIL else [])
+SUBSCRIBERS_FILE = os.getenv("SUBSCRIBERS_FILE", "subscribers.txt")
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "4"))
+RESEND_RATE_LIMIT = float(os.getenv("RESEND_RATE_LIMIT", "2"))
+SMTP_RATE_LIMIT = float(os.getenv("SMTP_RATE_LIMIT", "5"))
+
 # Twitter Configuration
 # 监控列表：特朗普 + 核心新闻源 + 关键人物
 TWITTER_USERS = [
@@ -22,7 +31,111 @@ TWITTER_USERS = [
     "DeItaone",         # Walter Bloomberg (全球金融快讯，非常快)
 ]
 CHECK_INTERVAL = 300 # Check every 5 minutes
+# Recently seen tweet IDs remembered per user: tweets just below the watermark that are not
+# among them (skipped by a lagging mirror) are still picked up, repeats are dropped
+STATE_RECENT_IDS = int(os.getenv("STATE_RECENT_IDS", "100"))
+# Cross-account / cross-mirror dedup of emitted tweets: entry lifetime (seconds) and cap
+DEDUP_TTL = int(os.getenv("DEDUP_TTL", str(48 * 3600)))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "5000"))
+
+# Digest Batching
+# Seconds new tweets may wait to be coalesced into one digest (0 = send every cycle)
+DIGEST_WINDOW = float(os.getenv("DIGEST_WINDOW", "0"))
+# Send earlier once this many tweets / bytes of text + images are buffered;
+# larger digests are split into several emails of at most these sizes
+DIGEST_MAX_TWEETS = int(os.getenv("DIGEST_MAX_TWEETS", "30"))
+DIGEST_MAX_BYTES = int(os.getenv("DIGEST_MAX_MB", "8")) * 1024 * 1024
+
+# Outbox (durable email queue)
+# Delivery attempts before a message is marked failed; retry delay doubles from base up to max (seconds)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "30"))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "3600"))
+# Seconds delivered messages are kept (run_once.py drops them right away: it commits outbox.db)
+OUTBOX_KEEP_SENT = float(os.getenv("OUTBOX_KEEP_SENT", "86400"))
+
+# Breaking News Alerts
+# Tweets from these accounts, or containing one of these keywords, are emailed immediately
+# as text-only alerts (comma separated, e.g. ALERT_USERS=DeItaone ALERT_KEYWORDS=breaking,tariff).
+# They still appear in the regular digest with their images.
+ALERT_USERS = [u.strip() for u in os.getenv("ALERT_USERS", "").split(",") if u.strip()]
+ALERT_KEYWORDS = [k.strip() for k in os.getenv("ALERT_KEYWORDS", "").split(",") if k.strip()]
+
+# Daemon Mode
+# "1" = event-loop daemon with an independent timer per account and separate
+# poll / image / send stages, instead of the fixed `schedule` cycle
+DAEMON_MODE = os.getenv("DAEMON_MODE", "0") == "1"
+# Random +/- seconds added to each account's poll interval
+POLL_JITTER = float(os.getenv("POLL_JITTER", "30"))
+# Max batches waiting between pipeline stages
+DAEMON_QUEUE_SIZE = int(os.getenv("DAEMON_QUEUE_SIZE", "100"))
+
+# Adaptive Polling
+# "1" = learn each account's posting rate and poll busy accounts more often than quiet ones.
+# In daemon mode this sets each account's timer; in the schedule loop, accounts that are not
+# due yet are skipped (so they can only be polled less often than CHECK_INTERVAL).
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "0") == "1"
+ADAPTIVE_MIN_INTERVAL = float(os.getenv("ADAPTIVE_MIN_INTERVAL", "60"))
+ADAPTIVE_MAX_INTERVAL = float(os.getenv("ADAPTIVE_MAX_INTERVAL", "1800"))
+# Seconds of history used to estimate the posting rate
+ADAPTIVE_WINDOW = float(os.getenv("ADAPTIVE_WINDOW", str(6 * 3600)))
+# Expected new tweets per poll the interval aims for
+ADAPTIVE_TARGET_TWEETS = float(os.getenv("ADAPTIVE_TARGET_TWEETS", "1"))
+# Upper bound on feed polls per hour across all accounts
+POLL_BUDGET_PER_HOUR = float(os.getenv("POLL_BUDGET_PER_HOUR", "120"))
+
+# Polling Concurrency
+# Number of accounts polled in parallel per cycle (1 = legacy serial mode with a pause between users)
+POLL_WORKERS = int(os.getenv("POLL_WORKERS", "4"))
+# Max simultaneous requests to a single RSSHub host across all workers
+POLL_PER_HOST_LIMIT = int(os.getenv("POLL_PER_HOST_LIMIT", "2"))
+# Parallel image downloads per cycle (shared by all users' new tweets)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "8"))
+
+# Image Cache (images/ directory)
+# Total size kept on disk (originals + resized variants) and max age of an entry
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "200")) * 1024 * 1024
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_DAYS", "7")) * 24 * 3600
+
+# Image Resizing
+# Worker processes for decoding/resizing images (0 = resize in the main process)
+RESIZE_WORKERS = int(os.getenv("RESIZE_WORKERS", "2"))
+# JPEG quality of the thumbnails embedded in emails
+EMAIL_IMAGE_QUALITY = int(os.getenv("EMAIL_IMAGE_QUALITY", "80"))
+
+# Hedged RSSHub Requests
+# Race mirrors instead of waiting out each 30 s timeout in turn ("0" = sequential failover)
+HEDGED_REQUESTS = os.getenv("HEDGED_REQUESTS", "1") == "1"
+# Number of mirrors requested at once when a check starts
+HEDGE_FANOUT = int(os.getenv("HEDGE_FANOUT", "2"))
+# Seconds to wait for the in-flight mirrors before firing a backup request
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "3"))
+
+# RSSHub Instance Health
+# Consecutive failures before a mirror's circuit opens and it is skipped
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))
+# Seconds before a broken mirror gets a half-open probe (doubles per further failure, capped)
+HEALTH_COOLDOWN = float(os.getenv("HEALTH_COOLDOWN", "600"))
+HEALTH_MAX_COOLDOWN = float(os.getenv("HEALTH_MAX_COOLDOWN", "21600"))
+# Smoothing factor for the latency / success-rate EWMAs
+HEALTH_EWMA_ALPHA = float(os.getenv("HEALTH_EWMA_ALPHA", "0.3"))
 
 # Proxy Configuration (Optional)
 # Example: http://127.0.0.1:7890
 PROXY_URL = os.getenv("PROXY_URL")
+
+# HTTP Connection Pooling
+# Keep-alive connections kept per host, and number of hosts with a live pool
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "20"))
+# Per-host overrides, e.g. "pbs.twimg.com=16,rsshub.app=2"
+HTTP_HOST_POOL_SIZES = {
+    host.strip(): int(size)
+    for host, size in (
+        item.split("=", 1) for item in os.getenv("HTTP_HOST_POOL_SIZES", "pbs.twimg.com=16").split(",") if "=" in item
+    )
+}
+# Retries for failed GETs (connection errors, 429/5xx) with exponential backoff.
+# Not applied to RSSHub feed fetches: mirror failover and hedging handle those.
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "1"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
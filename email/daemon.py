@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from dedup import index as dedup_index
+from digest_batcher import buffer as digest_buffer
+from poll_scheduler import scheduler as poll_scheduler
+from stages import flush_digest, poll_user, prepare_images
+from state_store import state
+
+async def _run_blocking(executor, func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+async def _drain(queue, first):
+    """
+    Take `first` plus everything already waiting in `queue`, merged into one list.
+    """
+    items = list(first)
+    queue.task_done()
+    while not queue.empty():
+        items.extend(queue.get_nowait())
+        queue.task_done()
+    return items
+
+def _next_delay(user):
+    """
+    Seconds until the next poll of `user`: CHECK_INTERVAL, or the learned per-account
+    interval with adaptive polling, plus up to +/- POLL_JITTER (at most 10% of the interval).
+    """
+    if config.ADAPTIVE_POLLING:
+        interval = poll_scheduler.interval(user)
+    else:
+        interval = config.CHECK_INTERVAL
+    jitter = min(config.POLL_JITTER, interval * 0.1)
+    return max(1, interval + random.uniform(-jitter, jitter))
+
+class _InFlight:
+    """
+    Counts polls in progress and tweets not yet in the digest buffer. The monitor
+    state (watermarks) is only flushed when the count drops to zero, so the file never
+    gets ahead of tweets that exist only in the in-memory queues. Only touched from
+    the event loop; the flush runs on it too, so no poll can start meanwhile.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def hold(self, count=1):
+        self.count += count
+
+    def release(self, count=1):
+        self.count -= count
+        if self.count == 0:
+            state.flush()
+
+_in_flight = _InFlight()
+
+def _after_poll():
+    if config.ADAPTIVE_POLLING:
+        poll_scheduler.save()
+
+async def poll_loop(user, poll_executor, tweet_queue):
+    """
+    Poll one account forever on its own timer.
+    A slow or dead feed only delays this account, never the others.
+    """
+    # Spread the first polls out so all accounts do not hit the mirrors at once
+    await asyncio.sleep(random.uniform(0, config.POLL_JITTER))
+    while True:
+        _in_flight.hold()
+        tweets = await _run_blocking(poll_executor, poll_user, user)
+        await _run_blocking(poll_executor, _after_poll)
+        if tweets:
+            _in_flight.hold(len(tweets))
+            await tweet_queue.put(tweets)
+        _in_flight.release()
+        delay = _next_delay(user)
+        logging.info(f"Next poll of {user} in {int(delay)}s.")
+        await asyncio.sleep(delay)
+
+async def image_stage(image_executor, tweet_queue, send_queue):
+    """
+    Deduplicate new tweets and download/resize their images, batching whatever the
+    pollers produced while the previous batch was being processed.
+    """
+    while True:
+        tweets = await _drain(tweet_queue, await tweet_queue.get())
+        unique = dedup_index.filter_new(tweets)
+        if len(unique) < len(tweets):
+            _in_flight.release(len(tweets) - len(unique))
+        tweets = unique
+        if not tweets:
+            continue
+        try:
+            await _run_blocking(image_executor, prepare_images, tweets)
+        except Exception as e:
+            logging.error(f"Image stage failed, sending tweets without local images: {e}")
+        await send_queue.put(tweets)
+
+async def send_stage(send_executor, send_queue):
+    """
+    Coalesce tweets into the digest buffer and send when it is due (DIGEST_WINDOW
+    deadline or size limits). Sends run in their own thread, so a slow SMTP/Resend
+    call delays emails but never the polling.
+    """
+    while True:
+        timeout = digest_buffer.seconds_until_due()
+        try:
+            tweets = await asyncio.wait_for(send_queue.get(), timeout)
+            tweets = await _drain(send_queue, tweets)
+            digest_buffer.add(tweets)
+            # Buffered tweets are persisted: their watermarks may be saved now
+            _in_flight.release(len(tweets))
+        except asyncio.TimeoutError:
+            pass
+
+        if digest_buffer.due():
+            try:
+                await _run_blocking(send_executor, flush_digest)
+            except Exception as e:
+                # The tweets stay buffered: wait a little instead of retrying in a tight loop
+                logging.error(f"Send stage failed, retrying in {config.OUTBOX_RETRY_BASE:.0f}s: {e}")
+                await asyncio.sleep(config.OUTBOX_RETRY_BASE)
+
+async def run_daemon():
+    """
+    Poll -> image -> send pipeline on an asyncio event loop.
+    Each stage has its own thread pool and the stages talk through bounded queues
+    (DAEMON_QUEUE_SIZE batches), so memory stays bounded if a stage gets stuck.
+    """
+    poll_executor = ThreadPoolExecutor(max_workers=max(1, config.POLL_WORKERS), thread_name_prefix="poll")
+    image_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="images")
+    send_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="send")
+
+    # Tweets restored in the digest buffer are not emitted yet: keep their copies out
+    dedup_index.reserve(digest_buffer.peek())
+
+    tweet_queue = asyncio.Queue(maxsize=config.DAEMON_QUEUE_SIZE)
+    send_queue = asyncio.Queue(maxsize=config.DAEMON_QUEUE_SIZE)
+
+    tasks = [asyncio.create_task(poll_loop(user, poll_executor, tweet_queue), name=f"poll-{user}") for user in config.TWITTER_USERS]
+    tasks.append(asyncio.create_task(image_stage(image_executor, tweet_queue, send_queue), name="images"))
+    tasks.append(asyncio.create_task(send_stage(send_executor, send_queue), name="send"))
+
+    logging.info(f"Daemon started: {len(config.TWITTER_USERS)} poll timers, interval {config.CHECK_INTERVAL}s +/- {config.POLL_JITTER}s.")
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if _in_flight.count:
+            logging.warning(f"Not saving monitor state: {_in_flight.count} polls/tweets were not buffered yet and will be fetched again.")
+        else:
+            state.flush()
+        for executor in (poll_executor, image_executor, send_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def run():
+    try:
+        asyncio.run(run_daemon())
+    except KeyboardInterrupt:
+        logging.info("Daemon stopped.")
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import config
+from storage import atomic_write_json, load_json
+
+DEDUP_FILE = "tweet_dedup_index.json"
+
+# Shorter normalized texts ("BREAKING:", a lone link) are too generic to dedup on
+MIN_TEXT_LENGTH = 20
+
+_retweet_prefix = re.compile(r"^rt @\w+:\s*")
+_url = re.compile(r"https?://\S+")
+_whitespace = re.compile(r"\s+")
+
+def normalize_text(text):
+    """
+    Normalize tweet text for duplicate detection: lowercase, drop the "RT @user:"
+    prefix and links (t.co / mirror-specific URLs differ between copies), collapse whitespace.
+    """
+    text = _retweet_prefix.sub("", (text or "").lower().strip())
+    text = _url.sub("", text)
+    return _whitespace.sub(" ", text).strip()
+
+def text_hash(text):
+    normalized = normalize_text(text)
+    if len(normalized) < MIN_TEXT_LENGTH:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+class DedupIndex:
+    """
+    Bounded, persisted index of recently emitted tweets, keyed by tweet ID and by a
+    hash of the normalized text. It catches the same tweet arriving under several
+    monitored accounts (retweets/quotes, e.g. BBCBreaking and BBCWorld) or from
+    different mirrors. Entries expire after DEDUP_TTL and the index is capped at
+    DEDUP_MAX_ENTRIES per key type, oldest first.
+
+    Tweets let through by filter_new() are reserved (in memory) until they are
+    emitted, so a copy arriving while the first one waits in the digest buffer is
+    dropped as well.
+    """
+
+    def __init__(self, path=DEDUP_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        data = load_json(path, {})
+        self._ids = data.get("ids", {})
+        self._texts = data.get("texts", {})
+        self._reserved_ids = set()
+        self._reserved_texts = set()
+        self._dirty = False
+
+    def _is_duplicate(self, tweet, batch_ids, batch_texts):
+        digest = text_hash(tweet.get("text"))
+        if tweet["id"] in self._ids or tweet["id"] in self._reserved_ids or tweet["id"] in batch_ids:
+            return True, digest
+        if digest and (digest in self._texts or digest in self._reserved_texts or digest in batch_texts):
+            return True, digest
+        return False, digest
+
+    def _reserve(self, tweets):
+        for tweet in tweets:
+            self._reserved_ids.add(tweet["id"])
+            digest = text_hash(tweet.get("text"))
+            if digest:
+                self._reserved_texts.add(digest)
+
+    def reserve(self, tweets):
+        """
+        Reserve tweets that are already waiting to be emitted (e.g. the digest
+        buffer restored after a restart).
+        """
+        with self._lock:
+            self._reserve(tweets)
+
+    def is_known(self, tweet):
+        """
+        Whether `tweet` (or a copy of its text) was already emitted or is reserved.
+        """
+        with self._lock:
+            return self._is_duplicate(tweet, (), ())[0]
+
+    def filter_new(self, tweets):
+        """
+        Return `tweets` without those already emitted, reserved, or repeated within
+        the batch (the first copy wins). The returned tweets are reserved; nothing
+        is persisted until mark_emitted().
+        """
+        unique = []
+        batch_ids, batch_texts = set(), set()
+        with self._lock:
+            for tweet in tweets:
+                duplicate, digest = self._is_duplicate(tweet, batch_ids, batch_texts)
+                if duplicate:
+                    logging.info(f"Skipping duplicate tweet {tweet['id']} from {tweet.get('author')}.")
+                    continue
+                batch_ids.add(tweet["id"])
+                if digest:
+                    batch_texts.add(digest)
+                unique.append(tweet)
+            self._reserve(unique)
+
+        if len(unique) < len(tweets):
+            logging.info(f"Dropped {len(tweets) - len(unique)} duplicate tweets.")
+        return unique
+
+    def mark_emitted(self, tweets):
+        now = time.time()
+        with self._lock:
+            for tweet in tweets:
+                self._ids[tweet["id"]] = now
+                self._reserved_ids.discard(tweet["id"])
+                digest = text_hash(tweet.get("text"))
+                if digest:
+                    self._texts[digest] = now
+                    self._reserved_texts.discard(digest)
+            self._evict(now)
+            self._dirty = True
+
+    def _evict(self, now):
+        for entries in (self._ids, self._texts):
+            for key in [k for k, seen_at in entries.items() if now - seen_at > config.DEDUP_TTL]:
+                del entries[key]
+            overflow = len(entries) - config.DEDUP_MAX_ENTRIES
+            if overflow > 0:
+                for key in sorted(entries, key=entries.get)[:overflow]:
+                    del entries[key]
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {"ids": dict(self._ids), "texts": dict(self._texts)}
+            self._dirty = False
+        atomic_write_json(self.path, snapshot)
+
+index = DedupIndex()
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import time
+
+import config
+from storage import atomic_write_json, load_json
+
+BUFFER_FILE = "digest_buffer.json"
+
+def tweet_size(tweet):
+    """
+    Approximate bytes a tweet adds to a digest: its text plus its inline images.
+    """
+    size = len((tweet.get("text") or "").encode("utf-8"))
+    for path in tweet.get("local_images", []):
+        if os.path.exists(path):
+            size += os.path.getsize(path)
+    return size
+
+def split_digest(tweets, max_tweets=None, max_bytes=None):
+    """
+    Split `tweets` (in order) into parts of at most `max_tweets` tweets and about
+    `max_bytes` of text + images each. A single tweet larger than the budget gets a
+    part of its own rather than being dropped.
+    """
+    max_tweets = max_tweets or config.DIGEST_MAX_TWEETS
+    max_bytes = max_bytes or config.DIGEST_MAX_BYTES
+    parts, current, current_bytes = [], [], 0
+    for tweet in tweets:
+        size = tweet_size(tweet)
+        if current and (len(current) >= max_tweets or current_bytes + size > max_bytes):
+            parts.append(current)
+            current, current_bytes = [], 0
+        current.append(tweet)
+        current_bytes += size
+    if current:
+        parts.append(current)
+    return parts
+
+class DigestCoalescer:
+    """
+    Buffers new tweets between digests.
+
+    The buffer is flushed once its oldest tweet has waited DIGEST_WINDOW seconds, or
+    earlier when it holds DIGEST_MAX_TWEETS tweets or DIGEST_MAX_BYTES of content, so
+    quiet periods produce fewer, fuller emails and bursts are sent without delay.
+    The buffer is persisted, so buffered tweets survive a restart.
+    """
+
+    def __init__(self, path=BUFFER_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        data = load_json(path, {})
+        self._tweets = data.get("tweets", [])
+        self._first_at = data.get("first_at")
+        self._bytes = sum(tweet_size(tweet) for tweet in self._tweets)
+
+    def _save(self):
+        atomic_write_json(self.path, {"tweets": self._tweets, "first_at": self._first_at})
+
+    def add(self, tweets):
+        if not tweets:
+            return
+        with self._lock:
+            if not self._tweets:
+                self._first_at = time.time()
+            self._tweets.extend(tweets)
+            self._bytes += sum(tweet_size(tweet) for tweet in tweets)
+            self._save()
+
+    def peek(self):
+        """
+        A copy of the buffered tweets, leaving the buffer as it is.
+        """
+        with self._lock:
+            return list(self._tweets)
+
+    def __len__(self):
+        return len(self._tweets)
+
+    def seconds_until_due(self, now=None):
+        """
+        Seconds until the window deadline (0 if already due), or None if the buffer is empty.
+        """
+        with self._lock:
+            if not self._tweets:
+                return None
+            if len(self._tweets) >= config.DIGEST_MAX_TWEETS or self._bytes >= config.DIGEST_MAX_BYTES:
+                return 0
+            now = now or time.time()
+            return max(0, self._first_at + config.DIGEST_WINDOW - now)
+
+    def due(self, now=None):
+        return self.seconds_until_due(now) == 0
+
+    def clear(self, count):
+        """
+        Drop the oldest `count` tweets (those a digest was just queued for).
+        Tweets added since keep waiting, with the window restarted for them.
+        """
+        with self._lock:
+            sent, self._tweets = self._tweets[:count], self._tweets[count:]
+            if sent:
+                waited = time.time() - self._first_at
+                logging.info(f"Flushing digest buffer: {len(sent)} tweets, {sum(tweet_size(tweet) for tweet in sent) / 1024:.0f} KB, oldest waited {waited:.0f}s.")
+            self._first_at = time.time() if self._tweets else None
+            self._bytes = sum(tweet_size(tweet) for tweet in self._tweets)
+            self._save()
+
+buffer = DigestCoalescer()
@@ -0,0 +1,144 @@
+"""
+Fan-out delivery of one rendered email to many subscribers, shared by the Twitter
+monitor and street_english_app/daily_email.py (standard library only).
+
+The message is rendered once: Resend gets the same payload with only `to` changed
+(batched up to RESEND_BATCH_LIMIT per call when there are no attachments), and SMTP
+gets the MIME message serialized once with a per-recipient To header prepended.
+Calls are spread over a bounded thread pool and paced by a per-provider rate
+limiter. Results are reported per recipient as {address: None or error message}.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Resend's batch endpoint accepts at most 100 emails and no attachments
+RESEND_BATCH_LIMIT = 100
+
+def load_recipients(addresses, subscribers_file=None):
+    """
+    Merge a list (or comma separated string) of addresses with a subscribers file
+    (one address per line, '#' starts a comment). Duplicates are dropped
+    case-insensitively, keeping the first spelling and order.
+    """
+    if isinstance(addresses, str):
+        addresses = addresses.split(",")
+    candidates = list(addresses or [])
+    if subscribers_file and os.path.exists(subscribers_file):
+        try:
+            with open(subscribers_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    candidates.append(line.split("#", 1)[0])
+        except OSError as e:
+            logging.error(f"Error reading subscribers file {subscribers_file}: {e}")
+
+    recipients = []
+    seen = set()
+    for address in candidates:
+        address = address.strip()
+        if address and address.lower() not in seen:
+            seen.add(address.lower())
+            recipients.append(address)
+    return recipients
+
+class RateLimiter:
+    """
+    Spaces calls to at most `rate` per second across threads (0 disables the limit).
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider, rate):
+    """
+    Shared limiter for a provider, so concurrent fan-outs (digest, alerts, outbox
+    retries) respect one combined rate.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = RateLimiter(rate)
+        return limiter
+
+def fan_out(items, send_one, workers=4, limiter=None, attempts=1, retry_delay=1):
+    """
+    Call send_one(item) for every item on up to `workers` threads, retrying each up
+    to `attempts` times. Returns {item: None or error message}.
+    """
+    def run(item):
+        error = None
+        for attempt in range(attempts):
+            if limiter:
+                limiter.acquire()
+            try:
+                send_one(item)
+                return item, None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if attempt + 1 < attempts:
+                    time.sleep(retry_delay)
+        return item, error
+
+    if workers <= 1 or len(items) <= 1:
+        return dict(run(item) for item in items)
+    with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="fanout") as executor:
+        return dict(executor.map(run, items))
+
+def send_resend(resend_module, params, recipients, workers=4, limiter=None, attempts=3):
+    """
+    Send a Resend payload (without "to") to every recipient.
+    """
+    if params.get("attachments"):
+        return fan_out(
+            recipients,
+            lambda address: resend_module.Emails.send({**params, "to": [address]}),
+            workers=workers, limiter=limiter, attempts=attempts,
+        )
+
+    chunks = [tuple(recipients[i:i + RESEND_BATCH_LIMIT]) for i in range(0, len(recipients), RESEND_BATCH_LIMIT)]
+    chunk_results = fan_out(
+        chunks,
+        lambda chunk: resend_module.Batch.send([{**params, "to": [address]} for address in chunk]),
+        workers=workers, limiter=limiter, attempts=attempts,
+    )
+    return {address: error for chunk, error in chunk_results.items() for address in chunk}
+
+def send_smtp(pool, msg, from_addr, recipients, workers=4, limiter=None, attempts=1):
+    """
+    Send a MIME message to every recipient over a pooled SMTP session
+    (smtp_pool.SMTPConnectionPool), one transaction per recipient. The pool already
+    reconnects on dropped sessions, so other errors (refused recipients) are final.
+    """
+    del msg["To"]
+    data = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+    return fan_out(
+        recipients,
+        lambda address: pool.sendmail(from_addr, [address], b"To: " + address.encode("utf-8") + b"\r\n" + data),
+        workers=workers, limiter=limiter, attempts=attempts,
+    )
+
+def failed_recipients(results):
+    return [address for address, error in results.items() if error]
+
+def log_results(results, label="Email"):
+    failed = failed_recipients(results)
+    logging.info(f"{label}: delivered to {len(results) - len(failed)}/{len(results)} recipients.")
+    for address in failed:
+        logging.error(f"{label}: delivery to {address} failed: {results[address]}")
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+
+from storage import atomic_write_json, load_json
+
+VALIDATORS_FILE = "feed_validators.json"
+
+class FeedValidators:
+    """
+    HTTP cache validators per (instance, username) feed.
+
+    The ETag / Last-Modified of the last good response are replayed as
+    If-None-Match / If-Modified-Since so unchanged feeds come back as a bodyless 304.
+    Many RSSHub mirrors send no validators, so a SHA-256 of the body is kept as well:
+    an identical body is treated like a 304 and never parsed.
+    """
+
+    def __init__(self, path=VALIDATORS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries = load_json(path, {})
+        self._dirty = False
+
+    @staticmethod
+    def _key(instance, username):
+        return f"{instance}|{username}"
+
+    def request_headers(self, instance, username):
+        """
+        Conditional request headers for the feed, empty if we hold no validators.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(instance, username), {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, instance, username, content):
+        with self._lock:
+            entry = self._entries.get(self._key(instance, username), {})
+        return bool(entry.get("sha256")) and entry["sha256"] == hashlib.sha256(content).hexdigest()
+
+    def update(self, instance, username, response_headers, content):
+        entry = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+        with self._lock:
+            self._entries[self._key(instance, username)] = entry
+            self._dirty = True
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = dict(self._entries)
+                self._dirty = False
+            atomic_write_json(self.path, snapshot, indent=4)
+
+validators = FeedValidators()
@@ -0,0 +1,132 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+# Shared sessions: every feed fetch, image download and Resend call reuses pooled keep-alive connections.
+# Keyed by whether GETs are retried; feed fetches use the non-retrying one.
+_sessions = {}
+_session_lock = threading.Lock()
+
+def _build_retry(retries):
+    """
+    Retry policy for idempotent requests: connection errors and throttling/5xx answers
+    are retried with exponential backoff. POSTs (e.g. email sends) are never retried here.
+    """
+    return Retry(
+        total=retries,
+        backoff_factor=config.HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+def _build_adapter(pool_size, retries):
+    return HTTPAdapter(
+        pool_connections=config.HTTP_POOL_HOSTS,
+        pool_maxsize=pool_size,
+        max_retries=_build_retry(retries) if retries else 0,
+    )
+
+def get_session(retry=True):
+    """
+    Get the process-wide pooled session, creating it on first use.
+    Hosts listed in HTTP_HOST_POOL_SIZES get their own adapter and pool size.
+    With retry=False, failed requests are not retried (HTTP_RETRIES is ignored).
+    """
+    with _session_lock:
+        session = _sessions.get(retry)
+        if session is None:
+            retries = config.HTTP_RETRIES if retry else 0
+            session = requests.Session()
+            default_adapter = _build_adapter(config.HTTP_POOL_SIZE, retries)
+            session.mount("https://", default_adapter)
+            session.mount("http://", default_adapter)
+            for host, pool_size in config.HTTP_HOST_POOL_SIZES.items():
+                adapter = _build_adapter(pool_size, retries)
+                session.mount(f"https://{host}", adapter)
+                session.mount(f"http://{host}", adapter)
+            _sessions[retry] = session
+        return session
+
+def get_proxies():
+    if config.PROXY_URL:
+        return {
+            "http": config.PROXY_URL,
+            "https": config.PROXY_URL
+        }
+    return {}
+
+def get(url, retry=True, **kwargs):
+    """
+    GET through the shared session, routed via PROXY_URL when it is configured.
+    Pass retry=False when the caller handles failover itself (RSSHub feeds), so a
+    hanging host costs one timeout rather than one per retry.
+    """
+    kwargs.setdefault("proxies", get_proxies())
+    return get_session(retry).get(url, **kwargs)
+
+def connection_stats():
+    """
+    Per-host request and connection counts of the shared session.
+    Every request beyond the number of opened connections was served on a reused keep-alive connection.
+    """
+    stats = {}
+    with _session_lock:
+        sessions = list(_sessions.values())
+
+    adapters = {id(adapter): adapter for session in sessions for adapter in session.adapters.values()}.values()
+    for adapter in adapters:
+        managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {"requests": 0, "connections": 0})
+                host_stats["requests"] += pool.num_requests
+                host_stats["connections"] += pool.num_connections
+
+    for host_stats in stats.values():
+        host_stats["reused"] = max(0, host_stats["requests"] - host_stats["connections"])
+    return stats
+
+def log_connection_stats():
+    stats = connection_stats()
+    if not stats:
+        return
+    total_requests = sum(s["requests"] for s in stats.values())
+    total_reused = sum(s["reused"] for s in stats.values())
+    logging.info(f"HTTP pool: {total_reused}/{total_requests} requests reused a keep-alive connection across {len(stats)} hosts.")
+    for host, s in sorted(stats.items()):
+        logging.debug(f"HTTP pool {host}: {s['requests']} requests, {s['connections']} connections, {s['reused']} reused")
+
+def install_resend_client(resend_module):
+    """
+    Route Resend API calls through the shared session (resend >= 2.x exposes a pluggable HTTP client).
+    """
+    base_client = getattr(resend_module, "HTTPClient", None)
+    if base_client is None:
+        return False
+
+    class SessionResendClient(base_client):
+        def __init__(self, timeout=30):
+            self._timeout = timeout
+
+        def request(self, method, url, headers, json=None, files=None, data=None):
+            try:
+                if files is not None:
+                    resp = get_session().request(method=method, url=url, headers=headers, files=files, data=data, timeout=self._timeout)
+                else:
+                    resp = get_session().request(method=method, url=url, headers=headers, json=json if data is None else None, data=data, timeout=self._timeout)
+                return resp.content, resp.status_code, resp.headers
+            except requests.RequestException as e:
+                raise RuntimeError(f"Request failed: {e}") from e
+
+    resend_module.default_http_client = SessionResendClient()
+    return True
@@ -0,0 +1,201 @@
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import config
+from storage import atomic_write_json, load_json
+
+IMAGE_DIR = "images"
+INDEX_FILE = "index.json"
+
+def guess_extension(url, content_type=None):
+    """
+    Pick a file extension for a downloaded image from its Content-Type, URL path or
+    `format=` query parameter (pbs.twimg.com serves e.g. /media/abc?format=jpg&name=small).
+    """
+    if content_type:
+        ext = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if ext:
+            return ".jpg" if ext in (".jpe", ".jpeg") else ext
+    parsed = urlparse(url)
+    ext = os.path.splitext(parsed.path)[1].lower()
+    if ext:
+        return ext
+    fmt = parse_qs(parsed.query).get("format")
+    if fmt:
+        return f".{fmt[0].lower()}"
+    return ".jpg"
+
+class ImageCache:
+    """
+    Content-addressed on-disk cache for tweet images.
+
+    Originals are stored once per content hash as images/<h[:2]>/<hash><ext>, so the
+    same picture reposted under different URLs is kept once, and URLs sharing a
+    basename can no longer overwrite each other. The index maps each URL to its hash
+    so a known URL is never downloaded again, and records derived variants (e.g. the
+    300 px email thumbnail) next to the original so they are produced only once.
+    Entries are evicted by age (IMAGE_CACHE_MAX_AGE) and then least-recently-used
+    until the cache fits in IMAGE_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, root=IMAGE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        index = load_json(self.index_path, {})
+        self._urls = index.get("urls", {})
+        self._blobs = index.get("blobs", {})
+        self._dirty = False
+
+    def _blob_path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], f"{digest}{ext}")
+
+    def _touch(self, entry):
+        entry["last_access"] = time.time()
+        self._dirty = True
+
+    def lookup(self, url):
+        """
+        Path of the cached original for `url`, or None if it has to be downloaded.
+        """
+        with self._lock:
+            digest = self._urls.get(url)
+            entry = self._blobs.get(digest) if digest else None
+            if not entry:
+                return None
+            path = self._blob_path(digest, entry["ext"])
+            if not os.path.exists(path):
+                # File removed behind our back: forget it
+                self._urls.pop(url, None)
+                self._blobs.pop(digest, None)
+                self._dirty = True
+                return None
+            self._touch(entry)
+            return path
+
+    def temp_file(self):
+        """
+        Open a temp file inside the cache directory, for streaming a download into.
+        Returns (file object, path).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".download-", dir=self.root)
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def store(self, url, tmp_path, digest, ext):
+        """
+        Move a finished download into the cache under its content hash and return its path.
+        If the same content is already cached (another URL), the download is dropped.
+        """
+        path = self._blob_path(digest, ext)
+        with self._lock:
+            entry = self._blobs.get(digest)
+            if entry and os.path.exists(self._blob_path(digest, entry["ext"])):
+                os.remove(tmp_path)
+                path = self._blob_path(digest, entry["ext"])
+                logging.info(f"Image {url} already cached as {path}")
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                entry = {"ext": ext, "size": os.path.getsize(path), "created": time.time(), "variants": {}}
+                self._blobs[digest] = entry
+            self._urls[url] = digest
+            self._touch(entry)
+        return path
+
+    def _digest_of(self, path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        return name if name in self._blobs else None
+
+    def variant_path(self, path, tag, ext=None):
+        """
+        Where the `tag` variant of the cached image at `path` is stored (next to the original).
+        """
+        base, original_ext = os.path.splitext(path)
+        return f"{base}_{tag}{ext or original_ext}"
+
+    def get_variant(self, path, tag):
+        """
+        Path of an already produced variant of a cached image, or None.
+        """
+        with self._lock:
+            digest = self._digest_of(path)
+            if not digest:
+                return None
+            variant = self._blobs[digest]["variants"].get(tag)
+            if variant and os.path.exists(variant["path"]):
+                self._touch(self._blobs[digest])
+                return variant["path"]
+            return None
+
+    def add_variant(self, path, tag, variant_path):
+        """
+        Record a variant produced for the cached image at `path`.
+        `variant_path` may be `path` itself when the original is already suitable.
+        """
+        with self._lock:
+            digest = self._digest_of(path)
+            if not digest:
+                return
+            size = os.path.getsize(variant_path) if variant_path != path else 0
+            self._blobs[digest]["variants"][tag] = {"path": variant_path, "size": size}
+            self._dirty = True
+
+    def _remove_blob(self, digest):
+        entry = self._blobs.pop(digest)
+        paths = [self._blob_path(digest, entry["ext"])] + [v["path"] for v in entry["variants"].values()]
+        for path in set(paths):
+            if os.path.exists(path):
+                os.remove(path)
+        for url in [u for u, d in self._urls.items() if d == digest]:
+            del self._urls[url]
+        self._dirty = True
+
+    def evict(self):
+        """
+        Drop entries older than IMAGE_CACHE_MAX_AGE, then the least recently used ones
+        until the cache (originals plus variants) fits in IMAGE_CACHE_MAX_BYTES.
+        """
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for digest, entry in list(self._blobs.items()):
+                if now - entry["created"] > config.IMAGE_CACHE_MAX_AGE:
+                    self._remove_blob(digest)
+                    removed += 1
+
+            def entry_size(entry):
+                return entry["size"] + sum(v["size"] for v in entry["variants"].values())
+
+            total = sum(entry_size(entry) for entry in self._blobs.values())
+            for digest, entry in sorted(self._blobs.items(), key=lambda item: item[1]["last_access"]):
+                if total <= config.IMAGE_CACHE_MAX_BYTES:
+                    break
+                total -= entry_size(entry)
+                self._remove_blob(digest)
+                removed += 1
+
+        if removed:
+            logging.info(f"Evicted {removed} images from cache ({total / 1024 / 1024:.1f} MB left).")
+        return removed
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = {
+                    "urls": dict(self._urls),
+                    "blobs": {digest: dict(entry, variants=dict(entry["variants"])) for digest, entry in self._blobs.items()},
+                }
+                self._dirty = False
+            os.makedirs(self.root, exist_ok=True)
+            atomic_write_json(self.index_path, snapshot)
+
+cache = ImageCache()
@@ -0,0 +1,137 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+import config
+from image_cache import cache as image_cache
+
+# Long-lived pool so worker start-up is paid once per process, not once per digest
+_pool = None
+_pool_lock = threading.Lock()
+
+def make_email_thumbnail(input_path, output_path, max_width=300, quality=80):
+    """
+    Write an email-sized JPEG of `input_path` to `output_path`, keeping the original.
+    Returns (output_path, original_width); images already narrow enough are not
+    re-encoded and `input_path` itself is returned.
+
+    JPEGs are opened in draft mode so libjpeg decodes straight at 1/2, 1/4 or 1/8
+    scale: a 4000 px photo is never fully decoded for a 300 px thumbnail. The rest of
+    the way is a reduce() followed by a LANCZOS resample (thumbnail with reducing_gap).
+    Runs in worker processes, so it only returns values and does no logging.
+    """
+    with Image.open(input_path) as img:
+        original_width, original_height = img.size
+        if original_width <= max_width:
+            return input_path, original_width
+        if getattr(img, "is_animated", False):
+            # Re-encoding would drop the animation; CSS still caps the displayed size
+            return input_path, original_width
+
+        target = (max_width, max(1, round(original_height * max_width / original_width)))
+        if img.format == "JPEG":
+            img.draft("RGB", target)
+
+        img.thumbnail(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        if img.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white, the digest background
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        img.save(output_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    return output_path, original_width
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: polling threads may be mid-request, forking them is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=config.RESIZE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def prepare_email_images(paths, max_width=300):
+    """
+    Make email thumbnails for `paths` and return {input path: path to embed}.
+    Thumbnails already in the image cache are reused; the rest are decoded in a
+    process pool (RESIZE_WORKERS, 0 = in this process) so CPU-heavy decoding does not
+    hold up polling. Images that fail to process are left out of the result.
+    """
+    tag = f"w{max_width}"
+    quality = config.EMAIL_IMAGE_QUALITY
+    results = {}
+    jobs = {}
+
+    for path in dict.fromkeys(paths):
+        cached = image_cache.get_variant(path, tag)
+        if cached:
+            results[path] = cached
+        elif os.path.exists(path):
+            jobs[path] = image_cache.variant_path(path, tag, ".jpg")
+
+    if not jobs:
+        return results
+
+    if config.RESIZE_WORKERS > 0 and len(jobs) > 1:
+        try:
+            pool = _get_pool()
+            # Absolute paths: workers must not depend on the parent's working directory
+            futures = {
+                path: pool.submit(make_email_thumbnail, os.path.abspath(path), os.path.abspath(output), max_width, quality)
+                for path, output in jobs.items()
+            }
+            outcomes = {}
+            for path, future in futures.items():
+                try:
+                    outcomes[path] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    outcomes[path] = e
+        except BrokenProcessPool as e:
+            logging.error(f"Resize pool crashed ({e}), resizing in-process.")
+            _reset_pool()
+            outcomes = {path: _resize_inline(path, output, max_width, quality) for path, output in jobs.items()}
+    else:
+        outcomes = {path: _resize_inline(path, output, max_width, quality) for path, output in jobs.items()}
+
+    for path, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            logging.error(f"Failed to resize image {path}: {outcome}")
+            continue
+        output_path, original_width = outcome
+        if os.path.abspath(output_path) == os.path.abspath(path):
+            output_path = path
+            logging.info(f"Image {path} is already small enough ({original_width}px)")
+        else:
+            output_path = jobs[path]
+            logging.info(f"Resized image {path} from {original_width} to {max_width}px ({os.path.getsize(output_path)} bytes)")
+        image_cache.add_variant(path, tag, output_path)
+        results[path] = output_path
+
+    return results
+
+def _resize_inline(input_path, output_path, max_width, quality):
+    try:
+        return make_email_thumbnail(input_path, output_path, max_width, quality)
+    except Exception as e:
+        return e
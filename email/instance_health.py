@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+
+import config
+from storage import atomic_write_json, load_json
+
+HEALTH_FILE = "rsshub_health.json"
+
+# Latency assumed for mirrors we have never measured, so they rank between fast and slow ones
+DEFAULT_LATENCY = 5.0
+
+class InstanceHealth:
+    """
+    Persistent health scores for RSSHub mirrors.
+
+    Each mirror keeps an EWMA of its latency and success rate plus its failure streak.
+    After HEALTH_FAILURE_THRESHOLD consecutive failures the circuit opens and the mirror
+    is skipped for a cooldown that doubles with every further failure. Once the cooldown
+    has passed the mirror is half-open: a single probe request is allowed, and its outcome
+    closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, path=HEALTH_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._stats = load_json(path, {})
+        self._probing = set()
+        self._dirty = False
+
+    def _entry(self, instance):
+        entry = self._stats.get(instance)
+        if entry is None:
+            entry = {
+                "successes": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "success_rate": 1.0,
+                "latency": None,
+                "last_success": None,
+                "last_failure": None,
+            }
+            self._stats[instance] = entry
+        return entry
+
+    def _cooldown(self, entry):
+        extra_failures = entry["consecutive_failures"] - config.HEALTH_FAILURE_THRESHOLD
+        cooldown = config.HEALTH_COOLDOWN * (2 ** max(0, extra_failures))
+        return min(cooldown, config.HEALTH_MAX_COOLDOWN)
+
+    def _state(self, instance, now):
+        entry = self._stats.get(instance)
+        if not entry or entry["consecutive_failures"] < config.HEALTH_FAILURE_THRESHOLD:
+            return "closed"
+        if now - (entry["last_failure"] or 0) < self._cooldown(entry):
+            return "open"
+        return "half-open"
+
+    def _score(self, instance):
+        # Expected seconds per successful fetch: lower is better
+        entry = self._stats.get(instance)
+        if not entry:
+            return DEFAULT_LATENCY
+        latency = entry["latency"] if entry["latency"] is not None else DEFAULT_LATENCY
+        return latency / max(entry["success_rate"], 0.05)
+
+    def order(self, instances):
+        """
+        Return the mirrors to try, fastest healthy first.
+        Open circuits are left out; at most one half-open probe per mirror is handed out
+        and it is slotted in right after the best mirror, so it gets tried without
+        delaying the likely winner. If every mirror is open, all are returned, the one
+        that failed longest ago first.
+        """
+        now = time.time()
+        with self._lock:
+            healthy, probes, broken = [], [], []
+            for instance in instances:
+                state = self._state(instance, now)
+                if state == "closed":
+                    healthy.append(instance)
+                elif state == "half-open" and instance not in self._probing:
+                    self._probing.add(instance)
+                    probes.append(instance)
+                else:
+                    broken.append(instance)
+
+            healthy.sort(key=self._score)
+
+            if not healthy and not probes:
+                logging.warning("All RSSHub instances are circuit-broken, trying them anyway.")
+                return sorted(broken, key=lambda i: self._stats[i]["last_failure"] or 0)
+
+            if probes:
+                logging.info(f"Probing recovering RSSHub instances: {', '.join(probes)}")
+            return healthy[:1] + probes + healthy[1:]
+
+    def record_success(self, instance, latency):
+        alpha = config.HEALTH_EWMA_ALPHA
+        with self._lock:
+            entry = self._entry(instance)
+            entry["successes"] += 1
+            entry["consecutive_failures"] = 0
+            entry["success_rate"] = (1 - alpha) * entry["success_rate"] + alpha
+            if entry["latency"] is None:
+                entry["latency"] = latency
+            else:
+                entry["latency"] = (1 - alpha) * entry["latency"] + alpha * latency
+            entry["last_success"] = time.time()
+            self._probing.discard(instance)
+            self._dirty = True
+
+    def record_failure(self, instance):
+        alpha = config.HEALTH_EWMA_ALPHA
+        with self._lock:
+            entry = self._entry(instance)
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            entry["success_rate"] = (1 - alpha) * entry["success_rate"]
+            entry["last_failure"] = time.time()
+            if entry["consecutive_failures"] == config.HEALTH_FAILURE_THRESHOLD:
+                logging.warning(f"RSSHub instance {instance} failed {entry['consecutive_failures']} times in a row, opening circuit.")
+            self._probing.discard(instance)
+            self._dirty = True
+
+    def release(self, instance):
+        """
+        Hand back a probe slot that was never used (e.g. the check ended before reaching it).
+        """
+        with self._lock:
+            self._probing.discard(instance)
+
+    def save(self):
+        # The save lock keeps concurrent savers from renaming an older snapshot over a newer one
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = {instance: dict(entry) for instance, entry in self._stats.items()}
+                self._dirty = False
+            atomic_write_json(self.path, snapshot, indent=4)
+
+tracker = InstanceHealth()
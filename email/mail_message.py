@@ -0,0 +1,161 @@
+"""
+Provider-neutral outgoing message: HTML body plus attachments/inline images read
+from disk once, with adapters for the Resend API payload and a MIME
+multipart/related message for SMTP. Failing over between providers reuses the same
+bytes and the same base64 encoding.
+"""
+import base64
+import logging
+import mimetypes
+import mmap
+import os
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from email.mime.text import MIMEText
+
+# Files at least this large are mapped instead of read into memory
+MMAP_THRESHOLD = 1024 * 1024
+# Encode in slices that are a multiple of 3 so the pieces concatenate cleanly
+ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+# RFC 2045 line length for base64 bodies
+MIME_LINE_LENGTH = 76
+
+class MessagePart:
+    """
+    One attachment or inline image. `cid` is set for inline images.
+    """
+
+    def __init__(self, path, data, cid=None):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.data = data
+        self.cid = cid
+        self._b64 = None
+
+    @classmethod
+    def from_file(cls, path, cid=None):
+        """
+        Read (or map, for large files) a file once. Returns None if it is missing.
+        """
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size >= MMAP_THRESHOLD:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    data = f.read()
+        except OSError as e:
+            logging.warning(f"Skipping attachment {path}: {e}")
+            return None
+        return cls(path, data, cid)
+
+    @property
+    def mime_type(self):
+        mime_type, _ = mimetypes.guess_type(self.filename)
+        return mime_type
+
+    def b64(self):
+        """
+        Base64 of the content, computed once and shared by both adapters.
+        """
+        if self._b64 is None:
+            view = memoryview(self.data)
+            self._b64 = "".join(
+                base64.b64encode(view[i:i + ENCODE_CHUNK_SIZE]).decode("ascii")
+                for i in range(0, len(view), ENCODE_CHUNK_SIZE)
+            )
+            view.release()
+        return self._b64
+
+    def to_mime(self):
+        mime_type = self.mime_type
+        if self.cid and not (mime_type or "").startswith("image/"):
+            # Unknown extension: let MIMEImage sniff the subtype from the bytes
+            part = MIMEImage(bytes(self.data))
+        else:
+            maintype, subtype = (mime_type or "application/octet-stream").split("/", 1)
+            part = MIMENonMultipart(maintype, subtype)
+            encoded = self.b64()
+            part.set_payload("\n".join(
+                encoded[i:i + MIME_LINE_LENGTH] for i in range(0, len(encoded), MIME_LINE_LENGTH)
+            ))
+            part["Content-Transfer-Encoding"] = "base64"
+        if self.cid:
+            part.add_header("Content-ID", f"<{self.cid}>") # Note the angle brackets
+            part.add_header("Content-Disposition", "inline", filename=self.filename)
+        else:
+            part.add_header("Content-Disposition", "attachment", filename=self.filename)
+        return part
+
+    def to_resend(self):
+        attachment = {"filename": self.filename, "content": self.b64()}
+        if self.cid:
+            attachment["content_id"] = self.cid
+        return attachment
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+class MailMessage:
+    """
+    An email built once per digest and serialized per provider on demand.
+    """
+
+    def __init__(self, subject, html, attachments=None, inline_images=None):
+        self.subject = subject
+        self.html = html
+        self.parts = []
+        for img in inline_images or []:
+            part = MessagePart.from_file(img['path'], cid=img['cid'])
+            if part:
+                self.parts.append(part)
+        for file_path in attachments or []:
+            part = MessagePart.from_file(file_path)
+            if part:
+                self.parts.append(part)
+
+    @classmethod
+    def from_contents(cls, subject, contents, attachments=None, inline_images=None):
+        """
+        Build from send_email-style contents (a string or a list of strings).
+        """
+        if isinstance(contents, list):
+            html = "".join([str(c) for c in contents if isinstance(c, str)])
+        else:
+            html = str(contents)
+        return cls(subject, html, attachments, inline_images)
+
+    def to_resend(self, sender, to=None):
+        params = {
+            "from": sender,
+            "subject": self.subject,
+            "html": self.html,
+        }
+        if to:
+            params["to"] = to
+        if self.parts:
+            params["attachments"] = [part.to_resend() for part in self.parts]
+        return params
+
+    def to_mime(self, sender, to=None):
+        msg = MIMEMultipart('related')
+        msg['Subject'] = self.subject
+        msg['From'] = sender
+        if to:
+            msg['To'] = to if isinstance(to, str) else ", ".join(to)
+        msg.attach(MIMEText(self.html, 'html'))
+        for part in self.parts:
+            msg.attach(part.to_mime())
+        return msg
+
+    def close(self):
+        for part in self.parts:
+            part.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,10 +2,14 @@ import time
 import schedule
 import logging
 import config
-from twitter_monitor import check_for_new_tweets, download_image
-from email_sender import send_email
-from PIL import Image
-import os
+from outbox import outbox
+import http_client
+from state_store import state
+from dedup import index as dedup_index
+from digest_batcher import buffer as digest_buffer
+from poll_scheduler import scheduler as poll_scheduler
+from stages import flush_digest, poll_user, prepare_images
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(
@@ -17,140 +21,93 @@ logging.basicConfig(
     ]
 )
 
-def resize_image_for_email(input_path, max_width=300):
+def poll_all_users(users):
     """
-    Physically resize the image to a max width, saving over the original file.
-    This ensures that even if email clients ignore CSS, the image is small.
+    Poll every account and collect their new tweets.
+    With POLL_WORKERS > 1 the accounts are polled in parallel, so a cycle takes about
+    as long as the slowest feed; per-host limits are enforced in twitter_monitor.
     """
-    try:
-        with Image.open(input_path) as img:
-            original_width, original_height = img.size
-            if original_width > max_width:
-                ratio = max_width / original_width
-                new_height = int(original_height * ratio)
-                # Resize using high-quality resampling
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                img.save(input_path) # Overwrite
-                logging.info(f"Physically resized image {input_path} from {original_width} to {max_width}px")
-                return True
-            else:
-                logging.info(f"Image {input_path} is already small enough ({original_width}px)")
-                return True
-    except Exception as e:
-        logging.error(f"Failed to resize image {input_path}: {e}")
-        return False
+    all_new_tweets = []
+
+    if config.ADAPTIVE_POLLING:
+        due_users = [user for user in users if poll_scheduler.is_due(user)]
+        if len(due_users) < len(users):
+            skipped = [user for user in users if user not in due_users]
+            logging.info(f"Not due yet (adaptive polling): {', '.join(skipped)}")
+        users = due_users
+        if not users:
+            return all_new_tweets
+
+    if config.POLL_WORKERS <= 1:
+        for user in users:
+            all_new_tweets.extend(poll_user(user))
+            # Sleep briefly between users to avoid rate limiting
+            time.sleep(2)
+        return all_new_tweets
 
-def job():
+    workers = min(config.POLL_WORKERS, len(users))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poll") as executor:
+        futures = [executor.submit(poll_user, user) for user in users]
+        for future in as_completed(futures):
+            all_new_tweets.extend(future.result())
+
+    return all_new_tweets
+
+def job(flush=False):
+    """
+    Run one polling cycle. New tweets are buffered and a digest is sent when the
+    buffer is due (DIGEST_WINDOW / size limits); `flush` sends whatever is buffered
+    now, for one-shot runs that exit afterwards.
+    """
     logging.info("Starting batch check for all users...")
     
     # Store all found tweets across all users
-    all_new_tweets = []
-    
-    for user in config.TWITTER_USERS:
-        logging.info(f"Checking for new tweets from: {user}...")
-        try:
-            new_tweets = check_for_new_tweets(user)
-            
-            if not new_tweets:
-                logging.info(f"No new tweets found for {user}.")
-            else:
-                logging.info(f"Found {len(new_tweets)} new tweets for {user}.")
-                
-                # Add author info if missing and collect
-                for tweet in new_tweets:
-                    tweet["author"] = tweet.get("author", user)
-                    
-                    # PROCESS IMAGES: Download and Resize immediately if not already done
-                    # (check_for_new_tweets might have downloaded them, but we need to ensure resize)
-                    if tweet.get("local_images"):
-                        for local_path in tweet["local_images"]:
-                            if os.path.exists(local_path):
-                                resize_image_for_email(local_path, max_width=300)
-                    
-                    all_new_tweets.append(tweet)
-        
-        except Exception as e:
-            logging.error(f"An error occurred while checking {user}: {e}")
-            
-        # Sleep briefly between users to avoid rate limiting
-        time.sleep(2)
+    all_new_tweets = poll_all_users(config.TWITTER_USERS)
     
-    # After checking all users, send one summary email if there are new tweets
-    if all_new_tweets:
-        logging.info(f"Preparing summary email for {len(all_new_tweets)} total new tweets.")
-        
-        # Sort by ID (approx time) descending
-        all_new_tweets.sort(key=lambda x: int(x["id"]) if x["id"].isdigit() else x["id"], reverse=True)
-        
-        # Prepare email content
-        subject = f"推特监控汇总: 发现 {len(all_new_tweets)} 条新消息"
-        
-        email_body = ""
-        email_body += f"<h1>推特监控汇总 ({len(all_new_tweets)} 条)</h1>"
-        email_body += f"<p>检测时间: {time.strftime('%Y-%m-%d %H:%M:%S')}</p>"
-        email_body += "<hr>"
-        
-        inline_images_list = []
-        image_counter = 0
-
-        for i, tweet in enumerate(all_new_tweets):
-            author = tweet["author"]
-            email_body += f"<div style='margin-bottom: 30px; padding-bottom: 20px; border-bottom: 1px solid #eee;'>"
-            email_body += f"<h2 style='margin-bottom: 10px; color: #1da1f2;'>{author}</h2>"
-            email_body += f"<p style='font-size: 16px; line-height: 1.5;'>{tweet['text']}</p>"
-            
-            # Images (Use local images as inline attachments via CID)
-            # This is the most robust way: no proxy reliance, no broken links.
-            if tweet.get("local_images"):
-                email_body += "<div style='margin-top: 10px;'>" 
-                for local_path in tweet["local_images"]:
-                    if os.path.exists(local_path):
-                        image_counter += 1
-                        cid = f"img_{image_counter}"
-                        inline_images_list.append({
-                            "path": local_path,
-                            "cid": cid
-                        })
-                        
-                        # Triple Lock Sizing (Container + HTML + CSS)
-                        # Plus the image itself is physically resized to 300px max.
-                        email_body += f"""
-                        <div style="max-width: 300px; margin-top: 5px;">
-                            <img src="cid:{cid}" width="300" style="width: 300px; max-width: 100%; height: auto; border-radius: 8px; display: block; border: 1px solid #eee;">
-                        </div><br>
-                        """
-            
-            # Fallback to remote images if local download failed but remote exists
-            elif tweet.get("images"):
-                 email_body += "<div style='margin-top: 10px; max-width: 300px;'>" 
-                 for img_url in tweet["images"]:
-                     # Fallback to simple proxy or original URL
-                     proxy_url = f"https://wsrv.nl/?url={img_url}"
-                     email_body += f"<img src='{proxy_url}' width='300' style='width: 300px; max-width: 100%; height: auto; border-radius: 8px; margin-top: 5px; display: block; border: 1px solid #eee;'><br>"
-                 email_body += "</div>"
-
+    # Retweets/quotes show up under several accounts: keep one copy, before any image work
+    # (tweets still waiting in the buffer, e.g. from an earlier run, count as copies too)
+    dedup_index.reserve(digest_buffer.peek())
+    all_new_tweets = dedup_index.filter_new(all_new_tweets)
 
-            
-            email_body += f"<p><a href='{tweet['link']}' style='color: #888; text-decoration: none;'>🔗 查看原推</a></p>"
-            email_body += "</div>"
-        
-        # Send digest email (with inline images)
-        # Switch back to Resend as primary provider per user request
-        success = send_email(subject, email_body, attachments=None, inline_images=inline_images_list, provider='resend')
-        
-        if success:
-            logging.info("Summary email sent successfully.")
-        else:
-            logging.error("Failed to send summary email.")
+    if all_new_tweets:
+        prepare_images(all_new_tweets)
+        digest_buffer.add(all_new_tweets)
     else:
         logging.info("No new tweets found in this cycle.")
 
+    # Send one summary email once the buffer is due
+    if digest_buffer.due() or (flush and len(digest_buffer)):
+        try:
+            flush_digest()
+        except Exception as e:
+            # The buffer is kept (and persisted), so its tweets go out with the next digest
+            logging.error(f"Failed to queue the digest, keeping {len(digest_buffer)} tweets buffered: {e}")
+    elif len(digest_buffer):
+        logging.info(f"{len(digest_buffer)} tweets buffered, digest due in {digest_buffer.seconds_until_due():.0f}s.")
+
+    # Persist this cycle's watermarks in one atomic write
+    state.flush()
+    if config.ADAPTIVE_POLLING:
+        poll_scheduler.save()
+        poll_scheduler.log_intervals(config.TWITTER_USERS)
+
+    http_client.log_connection_stats()
     logging.info("Batch check completed.")
 
 def main():
     logging.info(f"Starting Twitter Monitor for {len(config.TWITTER_USERS)} users.")
     logging.info(f"Users: {', '.join(config.TWITTER_USERS)}")
     logging.info(f"Check interval: {config.CHECK_INTERVAL} seconds")
+    logging.info(f"Poll workers: {config.POLL_WORKERS} (max {config.POLL_PER_HOST_LIMIT} per RSSHub host)")
+
+    # Deliver queued emails in the background (and replay any left from a previous run)
+    outbox.start_worker()
+
+    if config.DAEMON_MODE:
+        # Event-loop daemon: independent per-user timers and pipelined stages
+        import daemon
+        daemon.run()
+        return
     
     # Run once immediately
     job()
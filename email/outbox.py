@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import config
+from email_sender import deliver_email
+from fanout import failed_recipients
+from renderer import escape
+
+OUTBOX_FILE = "outbox.db"
+
+# On retries the other provider is tried first
+ALTERNATE_PROVIDER = {"resend": "qq", "qq": "resend"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    subject TEXT NOT NULL,
+    html TEXT NOT NULL,
+    inline_images TEXT NOT NULL,
+    attachments TEXT NOT NULL,
+    provider TEXT,
+    recipients TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+def remote_fallback(html, inline_images):
+    """
+    Swap inline images whose file is gone for their remote URL, if they have one.
+    A digest replayed by the next one-shot run finds no images/ directory, and a
+    missing file would otherwise leave a dangling cid: reference.
+    Returns (html, inline images still attached).
+    """
+    attached = []
+    for image in inline_images:
+        if os.path.exists(image["path"]):
+            attached.append(image)
+        elif image.get("url"):
+            html = html.replace(f'"cid:{image["cid"]}"', f'"{escape(image["url"])}"')
+        else:
+            logging.warning(f"Inline image {image['path']} is missing and has no remote URL.")
+    return html, attached
+
+class Outbox:
+    """
+    Durable queue of outgoing emails in SQLite (WAL mode).
+
+    Digests are enqueued first and delivered by a background worker, so a slow or
+    failing provider never blocks polling and a message is never lost once its
+    tweets' watermarks have moved on. Failed deliveries are retried with exponential
+    backoff (OUTBOX_RETRY_BASE doubling up to OUTBOX_RETRY_MAX, with jitter),
+    alternating between Resend and QQ Mail; after OUTBOX_MAX_ATTEMPTS a message is
+    marked 'failed' and kept for inspection. Messages pending at shutdown (or left
+    'sending' by a crash) are replayed on the next start.
+    """
+
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = path
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._deliver_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(outbox)")}
+            if "recipients" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN recipients TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(self, subject, html, inline_images=None, attachments=None, provider=None, recipients=None):
+        """
+        Durably queue an email and wake the worker. Returns the message id.
+        `recipients` defaults to the subscriber list at delivery time.
+        """
+        return self.enqueue_many([dict(
+            subject=subject, html=html, inline_images=inline_images, attachments=attachments,
+            provider=provider, recipients=recipients,
+        )])[0]
+
+    def enqueue_many(self, messages):
+        """
+        Queue several emails (dicts of enqueue() arguments) in one transaction:
+        either all of them are queued or, if this raises, none is. Returns their ids.
+        """
+        now = time.time()
+        message_ids = []
+        with self._connect() as conn:
+            for message in messages:
+                recipients = message.get("recipients")
+                cursor = conn.execute(
+                    "INSERT INTO outbox (created_at, subject, html, inline_images, attachments, provider, recipients, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now, message["subject"], message["html"], json.dumps(message.get("inline_images") or []),
+                     json.dumps(message.get("attachments") or []), message.get("provider"),
+                     json.dumps(recipients) if recipients else None, now),
+                )
+                message_ids.append(cursor.lastrowid)
+        for message_id, message in zip(message_ids, messages):
+            logging.info(f"Queued email #{message_id}: {message['subject']}")
+        self._wakeup.set()
+        return message_ids
+
+    def recover(self):
+        """
+        Put rows left in 'sending' by a crash back to 'pending'. Only the process
+        that delivers may call this (not at import: spawned image workers import this
+        module too and would reset sends still in flight). Returns the number recovered.
+        """
+        with self._deliver_lock:
+            with self._connect() as conn:
+                recovered = conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'").rowcount
+        if recovered:
+            logging.warning(f"Recovered {recovered} interrupted email sends from the outbox.")
+        return recovered
+
+    def pending_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def _next_due_in(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return None
+        return max(0, row[0] - time.time())
+
+    def _backoff(self, attempts):
+        delay = min(config.OUTBOX_RETRY_BASE * (2 ** (attempts - 1)), config.OUTBOX_RETRY_MAX)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _provider_for(self, message):
+        provider = message["provider"]
+        if provider in ALTERNATE_PROVIDER and message["attempts"] % 2 == 1:
+            return ALTERNATE_PROVIDER[provider]
+        return provider
+
+    def _deliver(self, message):
+        provider = self._provider_for(message)
+        recipients = json.loads(message["recipients"]) if message["recipients"] else None
+        failed = None
+        html, inline_images = remote_fallback(message["html"], json.loads(message["inline_images"]))
+        try:
+            results = deliver_email(
+                message["subject"],
+                html,
+                attachments=json.loads(message["attachments"]) or None,
+                inline_images=inline_images or None,
+                provider=provider,
+                recipients=recipients,
+            )
+            failed = failed_recipients(results)
+            sent = bool(results) and not failed
+            if sent:
+                error = None
+            elif failed:
+                error = f"{len(failed)}/{len(results)} recipients failed: {results[failed[0]]}"
+            else:
+                error = "no recipients"
+        except Exception as e:
+            sent, error = False, str(e)
+
+        now = time.time()
+        with self._connect() as conn:
+            if sent:
+                conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?", (now, message["id"]))
+                logging.info(f"Delivered email #{message['id']} via {provider or 'default provider'}.")
+                return True
+
+            if failed and len(failed) < len(results):
+                # Only retry the recipients that did not get it
+                conn.execute("UPDATE outbox SET recipients = ? WHERE id = ?", (json.dumps(failed), message["id"]))
+
+            attempts = message["attempts"] + 1
+            if attempts >= config.OUTBOX_MAX_ATTEMPTS:
+                conn.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?", (attempts, error, message["id"]))
+                logging.error(f"Giving up on email #{message['id']} after {attempts} attempts: {error}")
+            else:
+                delay = self._backoff(attempts)
+                conn.execute(
+                    "UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                    (attempts, error, now + delay, message["id"]),
+                )
+                logging.warning(f"Email #{message['id']} attempt {attempts} failed ({error}), retrying in {delay:.0f}s.")
+        return False
+
+    def deliver_due(self):
+        """
+        Try every pending message whose retry time has come. Returns the number delivered.
+        """
+        delivered = 0
+        with self._deliver_lock:
+            with self._connect() as conn:
+                messages = conn.execute(
+                    "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id",
+                    (time.time(),),
+                ).fetchall()
+                conn.executemany("UPDATE outbox SET status = 'sending' WHERE id = ?", [(m["id"],) for m in messages])
+            for message in messages:
+                if self._deliver(message):
+                    delivered += 1
+        return delivered
+
+    def compact(self, keep_sent=None):
+        """
+        Drop messages delivered more than `keep_sent` seconds ago (default
+        OUTBOX_KEEP_SENT) and fold the WAL back into outbox.db, so the single file
+        holds every pending message (one-shot runs commit it for the next run).
+        """
+        if keep_sent is None:
+            keep_sent = config.OUTBOX_KEEP_SENT
+        with self._deliver_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    removed = conn.execute(
+                        "DELETE FROM outbox WHERE status = 'sent' AND sent_at <= ?",
+                        (time.time() - keep_sent,),
+                    ).rowcount
+                if removed:
+                    conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+        if removed:
+            logging.info(f"Removed {removed} delivered emails from the outbox.")
+        return removed
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                self.deliver_due()
+                timeout = self._next_due_in()
+            except Exception as e:
+                logging.error(f"Outbox worker error: {e}")
+                timeout = config.OUTBOX_RETRY_BASE
+            self._wakeup.wait(timeout)
+
+    def start_worker(self):
+        """
+        Start the background delivery thread (idempotent). Pending messages from a
+        previous run are delivered right away.
+        """
+        if self._worker is None or not self._worker.is_alive():
+            self.recover()
+            pending = self.pending_count()
+            if pending:
+                logging.info(f"Replaying {pending} pending emails from the outbox.")
+            self._worker = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._worker.start()
+        self._wakeup.set()
+
+outbox = Outbox()
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+import config
+from storage import atomic_write_json, load_json
+
+RATES_FILE = "poll_rates.json"
+
+# Tweet IDs are snowflakes: milliseconds since this epoch, shifted left by 22 bits
+TWITTER_EPOCH_MS = 1288834974657
+
+def tweet_timestamp(tweet_id):
+    """
+    Posting time (unix seconds) encoded in a tweet ID, or None if it is not a snowflake.
+    """
+    if not str(tweet_id).isdigit():
+        return None
+    timestamp = ((int(tweet_id) >> 22) + TWITTER_EPOCH_MS) / 1000
+    # IDs from before snowflakes (2010) decode to nonsense
+    return timestamp if timestamp > TWITTER_EPOCH_MS / 1000 else None
+
+class AdaptivePollScheduler:
+    """
+    Learns each account's posting rate and derives its poll interval.
+
+    The rate is the number of tweets seen in the last ADAPTIVE_WINDOW seconds, using
+    the timestamps encoded in the tweet IDs. An account is polled about every
+    ADAPTIVE_TARGET_TWEETS / rate seconds, clamped to [ADAPTIVE_MIN_INTERVAL,
+    ADAPTIVE_MAX_INTERVAL]; accounts with no recent tweets sit at the maximum. If the
+    resulting polls would exceed POLL_BUDGET_PER_HOUR in total, every interval is
+    stretched by the same factor so the shared mirrors see a bounded load.
+    """
+
+    def __init__(self, path=RATES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._users = load_json(path, {})
+        self._dirty = False
+
+    def _user(self, username):
+        return self._users.setdefault(username, {"timestamps": [], "last_poll": 0})
+
+    def observe(self, username, tweets, now=None):
+        """
+        Record a finished poll of `username` and the new tweets it returned.
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self._user(username)
+            entry["last_poll"] = now
+            for tweet in tweets:
+                entry["timestamps"].append(tweet_timestamp(tweet["id"]) or now)
+            cutoff = now - config.ADAPTIVE_WINDOW
+            entry["timestamps"] = sorted(t for t in set(entry["timestamps"]) if t >= cutoff)
+            self._dirty = True
+
+    def _base_interval(self, username, now):
+        entry = self._users.get(username)
+        cutoff = now - config.ADAPTIVE_WINDOW
+        recent = [t for t in entry["timestamps"] if t >= cutoff] if entry else []
+        if not recent:
+            return config.ADAPTIVE_MAX_INTERVAL
+        rate = len(recent) / config.ADAPTIVE_WINDOW
+        interval = config.ADAPTIVE_TARGET_TWEETS / rate
+        return min(max(interval, config.ADAPTIVE_MIN_INTERVAL), config.ADAPTIVE_MAX_INTERVAL)
+
+    def intervals(self, users, now=None):
+        """
+        Poll interval in seconds for each of `users`, within the global request budget.
+        """
+        now = now or time.time()
+        with self._lock:
+            intervals = {user: self._base_interval(user, now) for user in users}
+
+        polls_per_hour = sum(3600 / interval for interval in intervals.values())
+        if polls_per_hour > config.POLL_BUDGET_PER_HOUR:
+            stretch = polls_per_hour / config.POLL_BUDGET_PER_HOUR
+            intervals = {user: interval * stretch for user, interval in intervals.items()}
+        return intervals
+
+    def interval(self, username, users=None, now=None):
+        users = set(users or config.TWITTER_USERS) | {username}
+        return self.intervals(users, now)[username]
+
+    def is_due(self, username, now=None):
+        """
+        Whether `username` should be polled now (always true for a never-polled account).
+        """
+        now = now or time.time()
+        with self._lock:
+            last_poll = self._users.get(username, {}).get("last_poll", 0)
+        return now - last_poll >= self.interval(username, now=now)
+
+    def log_intervals(self, users):
+        intervals = self.intervals(users)
+        summary = ", ".join(f"{user}={int(interval)}s" for user, interval in intervals.items())
+        logging.info(f"Adaptive poll intervals: {summary}")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {user: dict(entry) for user, entry in self._users.items()}
+            self._dirty = False
+        atomic_write_json(self.path, snapshot)
+
+scheduler = AdaptivePollScheduler()
@@ -0,0 +1,140 @@
+"""
+Small HTML email renderer shared by the Twitter digest and
+street_english_app/daily_email.py (standard library only).
+
+Templates are parsed once into literal/field segments. Rendering appends pieces to
+a list that is joined once at the end, so output is linear in the number of items.
+Every value is HTML-escaped unless it is Markup or uses the `raw` filter.
+
+Placeholders use str.format syntax, with the format spec naming a filter:
+    {name}      escaped
+    {name:br}   escaped, newlines turned into <br>
+    {name:raw}  inserted as-is (trusted HTML)
+Literal braces are written {{ and }}.
+"""
+import html
+import string
+
+class Markup(str):
+    """
+    Trusted HTML that is inserted without escaping.
+    """
+
+def escape(value):
+    if isinstance(value, Markup):
+        return value
+    return Markup(html.escape("" if value is None else str(value), quote=True))
+
+def escape_br(value):
+    return Markup(escape(value).replace("\r\n", "\n").replace("\n", "<br>"))
+
+FILTERS = {
+    "": escape,
+    "br": escape_br,
+    "raw": lambda value: Markup("" if value is None else str(value)),
+}
+
+_ENTITIES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+def escape_column(column):
+    """
+    Escape a whole column of strings. A pandas Series (anything with a `.str`
+    accessor) is escaped with vectorized string operations, other sequences
+    element by element.
+    """
+    if hasattr(column, "str"):
+        for char, entity in _ENTITIES:
+            column = column.str.replace(char, entity, regex=False)
+        return column
+    return [escape(value) for value in column]
+
+def escape_br_column(column):
+    column = escape_column(column)
+    if hasattr(column, "str"):
+        return column.str.replace("\r\n", "\n", regex=False).str.replace("\n", "<br>", regex=False)
+    return [escape_br(value) for value in column]
+
+COLUMN_FILTERS = {
+    "": escape_column,
+    "br": escape_br_column,
+    "raw": lambda column: column,
+}
+
+class Template:
+    """
+    A template compiled once into (literal, field, filter name) segments.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.segments = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if conversion:
+                raise ValueError(f"Conversions are not supported in templates: !{conversion}")
+            if field is not None and spec not in FILTERS:
+                raise ValueError(f"Unknown template filter: {spec}")
+            self.segments.append((literal, field, spec))
+
+    def render_into(self, out, **values):
+        """
+        Append the rendered pieces to the list `out`.
+        """
+        for literal, field, spec in self.segments:
+            if literal:
+                out.append(literal)
+            if field is not None:
+                out.append(FILTERS[spec](values[field]))
+
+    def render_columns(self, **columns):
+        """
+        Render once per row over equal-length columns, a whole column at a time.
+        With pandas Series (string dtype) every step is a vectorized concatenation
+        and the result is a Series of rendered rows; plain sequences give a list.
+        """
+        prepared = {}
+        for _, field, spec in self.segments:
+            if field is not None and field not in prepared:
+                prepared[field] = COLUMN_FILTERS[spec](columns[field])
+
+        if prepared and all(hasattr(column, "str") for column in prepared.values()):
+            rendered = ""
+            for literal, field, _ in self.segments:
+                if literal:
+                    rendered = rendered + literal
+                if field is not None:
+                    rendered = rendered + prepared[field]
+            return rendered
+
+        prepared = {field: list(column) for field, column in prepared.items()}
+        rows = len(next(iter(prepared.values()))) if prepared else 0
+        return [
+            "".join(literal + (prepared[field][row] if field is not None else "") for literal, field, _ in self.segments)
+            for row in range(rows)
+        ]
+
+    def render(self, **values):
+        out = []
+        self.render_into(out, **values)
+        return Markup("".join(out))
+
+class HtmlBuilder:
+    """
+    Streaming builder: templates and trusted fragments are appended to one list.
+    """
+
+    def __init__(self):
+        self._parts = []
+
+    def add(self, template, **values):
+        template.render_into(self._parts, **values)
+        return self
+
+    def write(self, fragment):
+        """
+        Append a trusted static fragment (e.g. a cached header or footer).
+        """
+        self._parts.append(fragment)
+        return self
+
+    def getvalue(self):
+        return Markup("".join(self._parts))
@@ -6,9 +6,20 @@ import logging
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from main import job
+from outbox import outbox
 
 if __name__ == "__main__":
     print("Executing single run of Twitter Monitor...")
-    # Trigger the job manually
-    job()
+    # Sends interrupted by a crashed previous run go out again below
+    outbox.recover()
+    # Trigger the job manually (and send anything buffered, since the process exits)
+    job(flush=True)
+    # No background worker in a one-shot run: deliver the queued emails now
+    outbox.deliver_due()
+    # Messages still pending are retried by the next run, which gets outbox.db from the repo;
+    # delivered ones are dropped so the committed file holds only what is pending
+    outbox.compact(keep_sent=0)
+    pending = outbox.pending_count()
+    if pending:
+        print(f"{pending} emails still pending in the outbox.")
     print("Execution complete.")
@@ -1,14 +1,14 @@
 import sys
 import os
 import logging
-import requests
 import time
-from PIL import Image
 
 # Ensure we can import from the current directory
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from email_sender import send_email
+import http_client
+from image_pipeline import prepare_email_images
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,40 +20,17 @@ def download_image(url, save_dir="images"):
     
     try:
         logging.info(f"Downloading simulation image from {url}...")
-        response = requests.get(url, stream=True, timeout=20)
-        if response.status_code == 200:
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(1024):
-                    f.write(chunk)
-            logging.info(f"Downloaded to {filename}")
-            return filename
+        with http_client.get(url, stream=True, timeout=20) as response:
+            if response.status_code == 200:
+                with open(filename, 'wb') as f:
+                    for chunk in response.iter_content(1024):
+                        f.write(chunk)
+                logging.info(f"Downloaded to {filename}")
+                return filename
     except Exception as e:
         logging.error(f"Failed to download image {url}: {e}")
     return None
 
-def resize_image_for_email(input_path, max_width=300):
-    """
-    Physically resize the image to a max width, saving over the original file.
-    This ensures that even if email clients ignore CSS, the image is small.
-    """
-    try:
-        with Image.open(input_path) as img:
-            original_width, original_height = img.size
-            if original_width > max_width:
-                ratio = max_width / original_width
-                new_height = int(original_height * ratio)
-                # Resize using high-quality resampling
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                img.save(input_path) # Overwrite
-                logging.info(f"Physically resized image {input_path} from {original_width} to {max_width}px")
-                return True
-            else:
-                logging.info(f"Image {input_path} is already small enough ({original_width}px)")
-                return True
-    except Exception as e:
-        logging.error(f"Failed to resize image {input_path}: {e}")
-        return False
-
 def run_simulation():
     logging.info("Starting simulation run with REAL photo...")
     
@@ -67,7 +44,7 @@ def run_simulation():
         return
 
     # 2. Physically resize it (Simulating main.py logic)
-    resize_image_for_email(local_path, max_width=300)
+    local_path = prepare_email_images([local_path], max_width=300).get(local_path, local_path)
     
     # 3. Construct Email Body (Simulating main.py logic)
     subject = "推特监控仿真: 真实图片渲染测试 (Simulation)"
@@ -113,5 +90,7 @@ def run_simulation():
     else:
         logging.error("Failed to send simulation email.")
 
+    http_client.log_connection_stats()
+
 if __name__ == "__main__":
     run_simulation()
@@ -0,0 +1,166 @@
+"""
+Keep-alive SMTP connection pool shared by the Twitter monitor's QQ Mail path and
+street_english_app/daily_email.py. Only uses the standard library, so the
+vocabulary job can import it without the monitor's dependencies.
+"""
+import logging
+import smtplib
+import ssl
+import threading
+import time
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.messages = 0
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated SMTP sessions to one server/account.
+
+    A session is reused for back-to-back sends (split digests, retries, several
+    recipients) instead of paying TCP + TLS + AUTH each time. Idle sessions are
+    checked with NOOP before reuse and dropped after `idle_timeout` seconds, a
+    session is retired after `max_messages` sends (servers such as QQ cap this), and
+    a send that fails on a dead connection is retried once on a fresh one.
+    """
+
+    def __init__(self, host, port, user, password, max_connections=2, max_messages=50, idle_timeout=60, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.stats = {"connects": 0, "reuses": 0, "messages": 0}
+
+    def _connect(self):
+        if self.port == 465:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.starttls(context=ssl.create_default_context())
+        smtp.login(self.user, self.password)
+        with self._lock:
+            self.stats["connects"] += 1
+        logging.info(f"Opened SMTP session to {self.host}:{self.port} as {self.user}")
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.smtp.quit()
+        except Exception:
+            try:
+                conn.smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn):
+        if time.monotonic() - conn.last_used > self.idle_timeout:
+            return False
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_alive(conn):
+                with self._lock:
+                    self.stats["reuses"] += 1
+                return conn
+            self._close(conn)
+
+    def _checkin(self, conn):
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            self._close(conn)
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    def _send(self, send):
+        with self._slots:
+            for attempt in range(2):
+                conn = self._checkout()
+                try:
+                    result = send(conn.smtp)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                    # The server rejected this message (e.g. 552, sender refused): resending
+                    # would fail the same way, but the session itself is still usable
+                    try:
+                        conn.smtp.rset()
+                        self._checkin(conn)
+                    except Exception:
+                        self._close(conn)
+                    raise
+                except smtplib.SMTPServerDisconnected as e:
+                    # A pooled session the server closed while idle. Other socket errors
+                    # (timeouts after DATA) are not retried: the message may have gone out
+                    self._close(conn)
+                    if attempt == 1:
+                        raise
+                    logging.warning(f"SMTP session to {self.host} dropped ({e}), reconnecting.")
+                    continue
+                except Exception:
+                    self._close(conn)
+                    raise
+                conn.messages += 1
+                with self._lock:
+                    self.stats["messages"] += 1
+                self._checkin(conn)
+                return result
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        """
+        Send an email.message.Message over a pooled session (same arguments as
+        smtplib.SMTP.send_message). Retries once on a fresh session if the server
+        closed the pooled one; rejections, timeouts and other errors are raised to
+        the caller without resending.
+        """
+        return self._send(lambda smtp: smtp.send_message(msg, from_addr=from_addr, to_addrs=to_addrs))
+
+    def sendmail(self, from_addr, to_addrs, data):
+        """
+        Send an already serialized message (bytes with CRLF line endings), as
+        smtplib.SMTP.sendmail. Used by fan-out to send one rendering to many recipients.
+        """
+        return self._send(lambda smtp: smtp.sendmail(from_addr, to_addrs, data))
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(host, port, user, password, **kwargs):
+    """
+    Get the shared pool for a server/account, creating it on first use.
+    """
+    key = (host, port, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            pool = SMTPConnectionPool(host, port, user, password, **kwargs)
+            _pools[key] = pool
+        return pool
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,187 @@
+"""
+Pipeline stages shared by the scheduled job (main.py) and the event-loop daemon
+(daemon.py): poll one account, prepare images, build and queue the digest.
+Kept out of main.py so the daemon does not import the entry script a second time.
+"""
+import logging
+import os
+import time
+from urllib.parse import quote
+
+import config
+from alerts import dispatch_alerts
+from dedup import index as dedup_index
+from digest_batcher import buffer as digest_buffer, split_digest
+from image_cache import cache as image_cache
+from image_pipeline import prepare_email_images
+from outbox import outbox
+from poll_scheduler import scheduler as poll_scheduler
+from renderer import HtmlBuilder, Template
+from twitter_monitor import check_for_new_tweets, download_tweet_images
+
+def poll_user(user):
+    """
+    Check a single account and return its new tweets.
+    Errors are logged and reported as no new tweets so one bad feed never aborts a cycle.
+    """
+    logging.info(f"Checking for new tweets from: {user}...")
+    try:
+        new_tweets = check_for_new_tweets(user)
+    except Exception as e:
+        logging.error(f"An error occurred while checking {user}: {e}")
+        return []
+
+    if config.ADAPTIVE_POLLING:
+        poll_scheduler.observe(user, new_tweets)
+
+    if not new_tweets:
+        logging.info(f"No new tweets found for {user}.")
+        return []
+
+    logging.info(f"Found {len(new_tweets)} new tweets for {user}.")
+
+    # Add author info if missing
+    for tweet in new_tweets:
+        tweet["author"] = tweet.get("author", user)
+
+    # Breaking news goes out right away instead of waiting for the digest
+    dispatch_alerts(user, new_tweets)
+
+    return new_tweets
+
+def prepare_images(tweets):
+    """
+    Image stage: download the images of the new tweets (bounded parallel pool across
+    all users) and physically resize them for email.
+    This ensures that even if email clients ignore CSS, the image is small.
+    """
+    download_tweet_images(tweets)
+
+    local_paths = [path for tweet in tweets for path in tweet.get("local_images", [])]
+    email_images = prepare_email_images(local_paths, max_width=300)
+    for tweet in tweets:
+        sources = tweet.get("image_sources", {})
+        tweet["local_images"] = [email_images[path] for path in tweet.get("local_images", []) if path in email_images]
+        tweet["image_sources"] = {email_images[path]: url for path, url in sources.items() if path in email_images}
+
+    image_cache.evict()
+    image_cache.save()
+
+# Digest templates, compiled once (see renderer.py for the placeholder syntax)
+DIGEST_HEADER = Template(
+    "<h1>推特监控汇总 ({count} 条)</h1>"
+    "<p>检测时间: {checked_at}</p>"
+    "<hr>"
+)
+TWEET_OPEN = Template(
+    "<div style='margin-bottom: 30px; padding-bottom: 20px; border-bottom: 1px solid #eee;'>"
+    "<h2 style='margin-bottom: 10px; color: #1da1f2;'>{marker}{author}</h2>"
+    "<p style='font-size: 16px; line-height: 1.5;'>{text:br}</p>"
+)
+# Triple Lock Sizing (Container + HTML + CSS)
+# Plus the image itself is physically resized to 300px max.
+INLINE_IMAGE = Template(
+    '<div style="max-width: 300px; margin-top: 5px;">'
+    '<img src="cid:{cid}" width="300" style="width: 300px; max-width: 100%; height: auto; border-radius: 8px; display: block; border: 1px solid #eee;">'
+    '</div><br>'
+)
+REMOTE_IMAGE = Template(
+    "<img src='{url}' width='300' style='width: 300px; max-width: 100%; height: auto; border-radius: 8px; margin-top: 5px; display: block; border: 1px solid #eee;'><br>"
+)
+TWEET_CLOSE = Template(
+    "<p><a href='{link}' style='color: #888; text-decoration: none;'>🔗 查看原推</a></p>"
+    "</div>"
+)
+INLINE_IMAGES_OPEN = "<div style='margin-top: 10px;'>"
+REMOTE_IMAGES_OPEN = "<div style='margin-top: 10px; max-width: 300px;'>"
+BLOCK_CLOSE = "</div>"
+
+def proxied_image_url(url):
+    """
+    Image URL through the wsrv.nl proxy, as used for tweets without local images.
+    """
+    if not url:
+        return None
+    return f"https://wsrv.nl/?url={quote(url, safe='')}"
+
+def build_digest(tweets):
+    """
+    Render the summary email for `tweets` (newest first).
+    Returns (subject, html body, inline images list of {'path', 'cid'}).
+    """
+    # Prepare email content
+    subject = f"推特监控汇总: 发现 {len(tweets)} 条新消息"
+
+    out = HtmlBuilder()
+    out.add(DIGEST_HEADER, count=len(tweets), checked_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+
+    inline_images_list = []
+    image_counter = 0
+
+    for tweet in tweets:
+        out.add(TWEET_OPEN, marker='⚡ ' if tweet.get('alerted') else '', author=tweet["author"], text=tweet['text'])
+
+        # Images (Use local images as inline attachments via CID)
+        # This is the most robust way: no proxy reliance, no broken links.
+        if tweet.get("local_images"):
+            out.write(INLINE_IMAGES_OPEN)
+            for local_path in tweet["local_images"]:
+                if os.path.exists(local_path):
+                    image_counter += 1
+                    cid = f"img_{image_counter}"
+                    inline_images_list.append({
+                        "path": local_path,
+                        "cid": cid,
+                        # Used by the outbox if the file is gone when the email is delivered
+                        "url": proxied_image_url(tweet.get("image_sources", {}).get(local_path)),
+                    })
+                    out.add(INLINE_IMAGE, cid=cid)
+            out.write(BLOCK_CLOSE)
+
+        # Fallback to remote images if local download failed but remote exists
+        elif tweet.get("images"):
+            out.write(REMOTE_IMAGES_OPEN)
+            for img_url in tweet["images"]:
+                # Fallback to simple proxy or original URL
+                out.add(REMOTE_IMAGE, url=proxied_image_url(img_url))
+            out.write(BLOCK_CLOSE)
+
+        out.add(TWEET_CLOSE, link=tweet['link'])
+
+    return subject, out.getvalue(), inline_images_list
+
+def send_digest(tweets):
+    """
+    Build the summary email(s) for `tweets`, queue them in the outbox for delivery,
+    then record the tweets in the dedup index.
+    Digests over DIGEST_MAX_TWEETS / DIGEST_MAX_BYTES are split into several emails,
+    queued together: if queueing fails nothing is queued and the error is raised.
+    """
+    logging.info(f"Preparing summary email for {len(tweets)} total new tweets.")
+    
+    # Sort by ID (approx time) descending
+    tweets.sort(key=lambda x: int(x["id"]) if x["id"].isdigit() else x["id"], reverse=True)
+
+    parts = split_digest(tweets)
+    messages = []
+    for number, part in enumerate(parts, start=1):
+        subject, email_body, inline_images_list = build_digest(part)
+        if len(parts) > 1:
+            subject += f" ({number}/{len(parts)})"
+        # Switch back to Resend as primary provider per user request
+        messages.append(dict(subject=subject, html=email_body, inline_images=inline_images_list, provider='resend'))
+
+    # Queue digest emails (with inline images); the outbox worker delivers them with retries
+    outbox.enqueue_many(messages)
+    dedup_index.mark_emitted(tweets)
+    dedup_index.save()
+    return True
+
+def flush_digest():
+    """
+    Send a digest of every buffered tweet. The buffer is only cleared once the
+    emails are in the outbox, so a failure keeps the tweets for the next attempt.
+    """
+    tweets = digest_buffer.peek()
+    send_digest(tweets)
+    digest_buffer.clear(len(tweets))
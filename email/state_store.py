@@ -0,0 +1,95 @@
+import logging
+import threading
+
+import config
+from storage import atomic_write_json, load_json
+
+LAST_TWEET_FILE = "tweet_monitor_state.json"
+
+class StateStore:
+    """
+    Per-user monitor state, loaded once into memory and flushed atomically.
+
+    For each user it keeps the last seen tweet ID (the watermark) and a bounded list
+    of recently seen IDs: a tweet a lagging mirror skipped turns up below the watermark
+    later, and the list tells it apart from the tweets already sent. Updates only
+    touch memory; flush() writes the whole file once per cycle via
+    temp-file-then-rename, so a crash can never leave a half-written file and
+    concurrent pollers cannot lose each other's updates.
+    Files in the old format ({"user": "last_id"}) are read transparently.
+    """
+
+    def __init__(self, path=LAST_TWEET_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._users = {}
+        for username, value in load_json(path, {}).items():
+            if isinstance(value, dict):
+                self._users[username] = {
+                    "last_seen_id": value.get("last_seen_id"),
+                    "recent_ids": list(value.get("recent_ids", [])),
+                }
+            else:
+                self._users[username] = {"last_seen_id": value, "recent_ids": []}
+        self._dirty = False
+
+    def _user(self, username):
+        return self._users.setdefault(username, {"last_seen_id": None, "recent_ids": []})
+
+    def get_last_seen_id(self, username):
+        with self._lock:
+            entry = self._users.get(username)
+            return entry["last_seen_id"] if entry else None
+
+    def set_last_seen_id(self, username, tweet_id):
+        with self._lock:
+            self._user(username)["last_seen_id"] = tweet_id
+            self._dirty = True
+
+    def recent_ids(self, username):
+        with self._lock:
+            entry = self._users.get(username)
+            return list(entry["recent_ids"]) if entry else []
+
+    def add_seen_ids(self, username, tweet_ids):
+        """
+        Remember `tweet_ids` as seen, keeping the newest STATE_RECENT_IDS per user.
+        """
+        with self._lock:
+            recent = self._user(username)["recent_ids"]
+            for tweet_id in tweet_ids:
+                if tweet_id not in recent:
+                    recent.append(tweet_id)
+            del recent[:-config.STATE_RECENT_IDS]
+            self._dirty = True
+
+    def forget(self, username):
+        """
+        Drop all state of `username`, so the next check behaves like a first run.
+        """
+        with self._lock:
+            if self._users.pop(username, None) is not None:
+                self._dirty = True
+
+    def flush(self):
+        """
+        Write pending updates to disk (no-op if nothing changed).
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return True
+                snapshot = {
+                    username: {"last_seen_id": entry["last_seen_id"], "recent_ids": list(entry["recent_ids"])}
+                    for username, entry in self._users.items()
+                }
+                self._dirty = False
+            if not atomic_write_json(self.path, snapshot, indent=4):
+                with self._lock:
+                    self._dirty = True
+                logging.error("Monitor state not saved, will retry on next flush.")
+                return False
+            return True
+
+state = StateStore()
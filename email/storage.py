@@ -0,0 +1,37 @@
+import json
+import logging
+import os
+import tempfile
+
+def load_json(path, default):
+    """
+    Load a JSON state file, returning `default` if it is missing or unreadable.
+    """
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"Error reading state file {path}: {e}")
+        return default
+
+def atomic_write_json(path, data, indent=None):
+    """
+    Write `data` as JSON so that readers only ever see the old or the new file.
+    The content goes to a temp file in the same directory, is fsynced, then renamed over `path`.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logging.error(f"Error saving state file {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
@@ -1,7 +1,7 @@
 import config
 from email_sender import send_email
-from twitter_monitor import check_for_new_tweets
-import os
+from twitter_monitor import check_for_new_tweets, download_tweet_images
+from state_store import state
 import logging
 import html
 
@@ -25,22 +25,12 @@ def test():
     print(f"Testing user: {test_user}")
     
     try:
-        # 为了测试，我们临时删除 tweet_monitor_state.json 以便模拟第一次运行
-        # 或者我们只删除该用户的记录
-        state_file = "tweet_monitor_state.json"
-        if os.path.exists(state_file):
-            import json
-            try:
-                with open(state_file, "r") as f:
-                    data = json.load(f)
-                if test_user in data:
-                    del data[test_user]
-                    with open(state_file, "w") as f:
-                        json.dump(data, f)
-            except:
-                pass
+        # 为了测试，我们临时删除该用户的记录以便模拟第一次运行
+        state.forget(test_user)
             
         tweets = check_for_new_tweets(test_user)
+        download_tweet_images(tweets)
+        state.flush()
         
         if tweets:
             latest_tweet = tweets[0]
@@ -91,10 +81,7 @@ def test():
             if latest_tweet.get('local_images'):
                 attachments.extend(latest_tweet['local_images'])
                 email_html += "<p><b>图片附件预览（如未显示请查看附件栏）：</b></p>"
-                # Note: For inline images in yagmail with list contents, it's automatic.
-                # With HTML string, we rely on client showing attachments or simple inline logic.
-                # yagmail's 'contents' parameter handles paths as inline images if they are in the list.
-                # So we will pass [email_html, img_path1, img_path2...] to send_email.
+                # The local images are sent as attachments (see send_email(attachments=...) below)
             else:
                   # Fallback to remote links if download failed
                   # Use wsrv.nl as a reverse proxy to help load images in China/QQ Mail
@@ -119,13 +106,8 @@ def test():
     print("-----------------------------------\n")
 
     try:
-        # Prepare contents list
-        contents = [email_html]
-        # Add local images to contents to make them inline/attachments
-        if attachments:
-            contents.extend(attachments)
-            
-        success = send_email(subject, contents)
+        # File paths must go through attachments: contents is HTML only
+        success = send_email(subject, email_html, attachments=attachments or None)
         if success:
             print(f"✅ 邮件发送成功！请检查收件箱: {config.RECEIVER_EMAIL}")
         else:
@@ -1,10 +1,21 @@
-import requests
 from lxml import etree, html
+import hashlib
+import io
 import logging
 import os
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing
+from urllib.parse import urlparse
 
 import config
+import http_client
+from feed_cache import validators as feed_validators
+from image_cache import cache as image_cache, guess_extension
+from instance_health import tracker as health
+from state_store import state
 
 # RSSHub instances
 RSSHUB_INSTANCES = [
@@ -21,69 +32,85 @@ RSSHUB_INSTANCES = [
 ]
 
 
-import json
+# One semaphore per RSSHub host, shared by all polling workers
+_host_slots = {}
+_host_slots_lock = threading.Lock()
 
-LAST_TWEET_FILE = "tweet_monitor_state.json"
+def _host_slot(url):
+    """
+    Get the semaphore limiting concurrent requests to the host of `url`.
+    """
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(max(1, config.POLL_PER_HOST_LIMIT))
+            _host_slots[host] = slot
+    return slot
 
 def get_last_seen_id(username):
     """
     Get the last seen tweet ID for a specific user.
     """
-    if os.path.exists(LAST_TWEET_FILE):
-        try:
-            with open(LAST_TWEET_FILE, "r") as f:
-                data = json.load(f)
-                return data.get(username)
-        except Exception as e:
-            logging.error(f"Error reading state file: {e}")
-            return None
-    return None
+    return state.get_last_seen_id(username)
 
 def save_last_seen_id(username, tweet_id):
     """
     Save the last seen tweet ID for a specific user.
+    Kept in memory until state.flush() (main.job flushes once per cycle).
     """
-    data = {}
-    if os.path.exists(LAST_TWEET_FILE):
-        try:
-            with open(LAST_TWEET_FILE, "r") as f:
-                data = json.load(f)
-        except Exception as e:
-            logging.error(f"Error reading state file for update: {e}")
-    
-    data[username] = tweet_id
-    
-    try:
-        with open(LAST_TWEET_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-    except Exception as e:
-        logging.error(f"Error saving state file: {e}")
-
-def download_image(url, save_dir="images"):
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
-    filename = os.path.join(save_dir, url.split("/")[-1])
-    if "?" in filename:
-        filename = filename.split("?")[0]
-    
-    proxies = {}
-    if config.PROXY_URL:
-        proxies = {
-            "http": config.PROXY_URL,
-            "https": config.PROXY_URL
-        }
+    state.set_last_seen_id(username, tweet_id)
+
+def download_image(url):
+    """
+    Download an image into the content-addressed image cache and return its local path.
+    URLs already in the cache are not downloaded again.
+    """
+    cached = image_cache.lookup(url)
+    if cached:
+        return cached
 
     try:
-        response = requests.get(url, stream=True, timeout=10, proxies=proxies)
-        if response.status_code == 200:
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(1024):
-                    f.write(chunk)
-            return filename
+        # Closing the streamed response hands the connection back to the pool
+        with http_client.get(url, stream=True, timeout=10) as response:
+            if response.status_code == 200:
+                sha256 = hashlib.sha256()
+                f, tmp_path = image_cache.temp_file()
+                try:
+                    with f:
+                        for chunk in response.iter_content(1024):
+                            sha256.update(chunk)
+                            f.write(chunk)
+                except Exception:
+                    os.remove(tmp_path)
+                    raise
+                ext = guess_extension(url, response.headers.get("Content-Type"))
+                return image_cache.store(url, tmp_path, sha256.hexdigest(), ext)
     except Exception as e:
         logging.error(f"Failed to download image {url}: {e}")
     return None
 
+def download_tweet_images(tweets, max_workers=None):
+    """
+    Download the images of `tweets` in parallel and fill in their "local_images".
+    Meant to run once per cycle over the new tweets of all users, so the pool is
+    shared and each distinct URL is fetched only once.
+    """
+    urls = list(dict.fromkeys(url for tweet in tweets for url in tweet.get("images", [])))
+    if not urls:
+        return tweets
+
+    workers = min(max_workers or config.IMAGE_WORKERS, len(urls))
+    logging.info(f"Downloading {len(urls)} images with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image") as executor:
+        local_paths = dict(zip(urls, executor.map(download_image, urls)))
+
+    for tweet in tweets:
+        tweet["local_images"] = [local_paths[url] for url in tweet.get("images", []) if local_paths.get(url)]
+        # Remote source of each local copy, for when the file is gone at delivery time
+        tweet["image_sources"] = {local_paths[url]: url for url in tweet.get("images", []) if local_paths.get(url)}
+    return tweets
+
 def clean_html_content(html_content):
     """
     Parses HTML content and extracts text while preserving line breaks.
@@ -117,178 +144,362 @@ def clean_html_content(html_content):
         logging.warning(f"Error cleaning HTML content: {e}")
         return html_content
 
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Returned instead of the response when the feed has not changed since the last fetch
+NOT_MODIFIED = object()
+
+def fetch_feed(instance, username, headers=None, conditional=False):
+    """
+    Fetch the RSS feed of `username` from a single RSSHub instance.
+    Returns the HTTP response if it looks like a feed with items, otherwise None.
+    Validators are not stored here: the caller records them once the feed has
+    actually been processed.
+    With `conditional`, the stored validators are sent and NOT_MODIFIED is returned
+    on a 304 or a byte-identical body, without parsing anything.
+    The outcome and latency are recorded in the instance health tracker.
+    """
+    url = f"{instance}/twitter/user/{username}"
+    logging.info(f"Checking RSSHub: {url}...")
+
+    request_headers = dict(headers or {})
+    if conditional:
+        request_headers.update(feed_validators.request_headers(instance, username))
+
+    try:
+        with _host_slot(url):
+            started = time.monotonic()
+            # No transport retries: a hanging mirror must fail fast so hedging/failover can move on
+            response = http_client.get(url, retry=False, headers=request_headers, timeout=30)
+            latency = time.monotonic() - started
+    except Exception as e:
+        logging.error(f"Error checking RSSHub instance {instance}: {e}")
+        health.record_failure(instance)
+        return None
+
+    if response.status_code == 304 and conditional:
+        logging.info(f"Feed for {username} not modified on {instance} (304).")
+        health.record_success(instance, latency)
+        return NOT_MODIFIED
+
+    if response.status_code != 200:
+        logging.warning(f"RSSHub instance {instance} returned HTTP {response.status_code}")
+        health.record_failure(instance)
+        return None
+
+    if conditional and feed_validators.is_unchanged(instance, username, response.content):
+        logging.info(f"Feed for {username} unchanged on {instance} (same content hash).")
+        health.record_success(instance, latency)
+        return NOT_MODIFIED
+
+    # Cheap sanity check; the document is parsed incrementally by scan_feed()
+    if b"<item" not in response.content:
+        logging.warning(f"No items found in RSS from {instance}")
+        health.record_failure(instance)
+        return None
+
+    health.record_success(instance, latency)
+    return response
+
+def _iter_feeds_sequential(instances, username, headers, conditional):
+    """
+    Try the instances one by one, in the given order (classic failover).
+    """
+    remaining = list(instances)
+    try:
+        while remaining:
+            instance = remaining.pop(0)
+            feed = fetch_feed(instance, username, headers, conditional)
+            if feed is not None:
+                yield instance, feed
+    finally:
+        for instance in remaining:
+            health.release(instance)
+
+def _iter_feeds_hedged(instances, username, headers, conditional):
+    """
+    Race the instances: HEDGE_FANOUT requests start at once, and another backup is
+    started whenever HEDGE_DELAY seconds pass without a valid feed (or as soon as an
+    in-flight request fails). Valid feeds are yielded in completion order, so the
+    fastest healthy mirror wins; when the caller stops iterating, queued requests
+    are cancelled and requests still in flight are abandoned.
+    """
+    remaining = list(instances)
+    in_flight = {}
+    executor = ThreadPoolExecutor(max_workers=len(remaining) or 1, thread_name_prefix="hedge")
+
+    def launch():
+        instance = remaining.pop(0)
+        future = executor.submit(fetch_feed, instance, username, headers, conditional)
+        in_flight[future] = instance
+
+    try:
+        for _ in range(min(max(1, config.HEDGE_FANOUT), len(remaining))):
+            launch()
+
+        while in_flight:
+            done, _ = wait(list(in_flight), timeout=config.HEDGE_DELAY, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Nobody answered in time: hedge with the next mirror
+                if remaining:
+                    logging.info(f"No RSSHub response for {username} after {config.HEDGE_DELAY}s, starting a backup request.")
+                    launch()
+                continue
+
+            for future in done:
+                instance = in_flight.pop(future)
+                feed = future.result()
+                if feed is not None:
+                    yield instance, feed
+                elif remaining:
+                    launch()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        for instance in remaining:
+            health.release(instance)
+
+def iter_feeds(username, headers=None, conditional=False):
+    """
+    Yield (instance, response) for each valid feed of `username` (the response
+    may be NOT_MODIFIED for conditional requests).
+    Mirrors are tried in health order (fastest healthy first, circuit-broken ones
+    skipped); with hedged requests enabled they are also raced.
+    """
+    instances = health.order(RSSHUB_INSTANCES)
+    if config.HEDGED_REQUESTS:
+        return _iter_feeds_hedged(instances, username, headers, conditional)
+    return _iter_feeds_sequential(instances, username, headers, conditional)
+
+# Items scanned per feed, newest first
+MAX_FEED_ITEMS = 10
+# Consecutive items at or below the watermark before the scan stops
+# (more than one, so a pinned old tweet at the top does not hide newer ones)
+STOP_AFTER_OLD_ITEMS = 3
+
+def extract_tweet_id(link, guid):
+    """
+    Get the tweet ID from an item's link or guid.
+    RSSHub link format usually: https://twitter.com/user/status/123...
+    """
+    if "/status/" in link:
+        return link.split("/status/")[1].split("?")[0]
+    if "/status/" in guid:
+        return guid.split("/status/")[1].split("?")[0]
+    return None
+
+def is_newer_id(tweet_id, last_seen_id):
+    if tweet_id.isdigit() and last_seen_id.isdigit():
+        return int(tweet_id) > int(last_seen_id)
+    # Fallback string comparison if IDs are not digits (unlikely for Twitter)
+    return tweet_id > last_seen_id
+
+def _id_sort_key(tweet_id):
+    return int(tweet_id) if tweet_id.isdigit() else tweet_id
+
+def _tweet_sort_key(tweet):
+    return _id_sort_key(tweet["id"])
+
+def scan_feed(content, username, last_seen_id=None, recent_ids=()):
+    """
+    Stream through an RSS document and return (author_name, candidates, ids_found).
+
+    Only the link/guid of each item is read up front to get its tweet ID. Items at or
+    below `last_seen_id` are discarded right away, so old tweets never reach HTML
+    cleaning or image handling; after STOP_AFTER_OLD_ITEMS old items in a row the rest
+    of the document is not parsed at all. Candidates are the raw fields of newer items.
+    The exception are items above the oldest of `recent_ids` (the IDs already seen)
+    but not among them: a lagging mirror skipped those, so they are kept as well.
+    Raises etree.XMLSyntaxError if the document is not valid XML.
+    """
+    recent = set(recent_ids)
+    floor = min(recent, key=_id_sort_key) if recent else None
+    author_name = username
+    candidates = []
+    ids_found = 0
+    scanned = 0
+    consecutive_old = 0
+
+    for _, elem in etree.iterparse(io.BytesIO(content), events=("end",), tag=("title", "item")):
+        if elem.tag == "title":
+            parent = elem.getparent()
+            if parent is not None and parent.tag == "channel" and elem.text:
+                # Extract Channel Title (Author Name)
+                # Clean up common suffixes in RSSHub/Nitter
+                author_name = elem.text.replace(" / Twitter", "").replace(" / X", "")
+            continue
+
+        i = scanned
+        scanned += 1
+        link = elem.findtext("link") or ""
+        guid = elem.findtext("guid") or link
+        tweet_id = extract_tweet_id(link, guid)
+
+        if tweet_id:
+            ids_found += 1
+            is_old = bool(last_seen_id) and not is_newer_id(tweet_id, last_seen_id)
+            if is_old and floor and is_newer_id(tweet_id, floor) and tweet_id not in recent:
+                logging.info(f"Tweet {tweet_id} of {username} is below the watermark but was never seen, keeping it.")
+                is_old = False
+            if is_old:
+                consecutive_old += 1
+            else:
+                consecutive_old = 0
+                candidates.append({
+                    "index": i,
+                    "id": tweet_id,
+                    "title": elem.findtext("title") or "",
+                    "link": link,
+                    "description": elem.findtext("description") or "",
+                })
+
+        # Free the parsed item (and anything before it) as we go
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+        if scanned >= MAX_FEED_ITEMS:
+            break
+        if consecutive_old >= STOP_AFTER_OLD_ITEMS:
+            logging.info(f"Reached already seen tweets for {username} after {scanned} items, stopping scan.")
+            break
+
+    logging.info(f"Scanned {scanned} items in RSS feed, {len(candidates)} new. Author: {author_name}")
+    return author_name, candidates, ids_found
+
+def build_tweet(candidate, username, author_name):
+    """
+    Turn a candidate item from scan_feed() into a tweet dict (text, images, id).
+    This is the expensive part (HTML parsing, text cleaning) and only runs for items
+    that passed the watermark filter.
+    """
+    i = candidate["index"]
+    tweet_id = candidate["id"]
+    title = candidate["title"]
+    description = candidate["description"]
+
+    logging.info(f"DEBUG Item {i}: title='{title}', link='{candidate['link']}'")
+    logging.info(f"DEBUG Item {i} description raw length: {len(description)}")
+
+    # Extract images from description HTML
+    # (downloaded later by download_tweet_images, once the tweet is known to be new)
+    images = []
+    if description:
+        desc_tree = html.fromstring(description)
+        img_srcs = desc_tree.xpath("//img/@src")
+        for src in img_srcs:
+            # RSSHub sometimes proxies images, sometimes uses original
+            # Filter out emojis (often from twemoji)
+            if "twemoji" in src or "emoji" in src:
+                continue
+            images.append(src)
+            
+    # Clean up title/text (remove HTML tags if any, though title is usually plain text)
+    # RSSHub title often contains the tweet text
+    # But sometimes title is truncated. Description usually has full HTML content.
+    
+    full_text = title
+    
+    if description:
+        try:
+            # Use new cleaning function
+            desc_text = clean_html_content(description)
+            # If description text is longer than title, or title ends with ..., use description text
+            if len(desc_text) > len(title) or title.endswith("..."):
+                full_text = desc_text
+        except Exception as e:
+            logging.warning(f"Failed to extract text from description: {e}")
+    
+    if not full_text or full_text == " ":
+        full_text = title # Fallback
+    
+    # Force Twitter link format
+    # Some RSSHub instances return nitter links or x.com links
+    # User requested https://twitter.com/
+    final_link = f"https://twitter.com/{username}/status/{tweet_id}"
+
+    logging.info(f"DEBUG Item {i} extracted: id={tweet_id}, text='{full_text}'")
+
+    return {
+        "id": tweet_id,
+        "text": full_text,
+        "images": images,
+        "local_images": [],
+        "link": final_link,
+        "author": author_name,
+        "is_pinned": False 
+    }
+
 def check_for_new_tweets(username="realDonaldTrump"):
     """
     Checks for new tweets using RSSHub.
     Returns a list of new tweets (dict with text, images, id).
     """
     headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        "User-Agent": USER_AGENT
     }
 
-    proxies = {}
-    if config.PROXY_URL:
-        proxies = {
-            "http": config.PROXY_URL,
-            "https": config.PROXY_URL
-        }
+    try:
+        return _check_feeds(username, headers)
+    finally:
+        health.save()
+        feed_validators.save()
 
-    for instance in RSSHUB_INSTANCES:
-        url = f"{instance}/twitter/user/{username}"
-        logging.info(f"Checking RSSHub: {url}...")
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=30, proxies=proxies)
-            
-            if response.status_code == 200:
-                # Check if response is valid XML
+def _check_feeds(username, headers):
+    """
+    Take the first feed that yields tweets and return the ones newer than the last seen ID.
+    """
+    last_seen_id = get_last_seen_id(username)
+
+    # Only revalidate once a watermark exists: a first run needs the full feed
+    with closing(iter_feeds(username, headers, conditional=bool(last_seen_id))) as feeds:
+        for instance, feed in feeds:
+            if feed is NOT_MODIFIED:
+                return []
+
+            try:
+                author_name, candidates, ids_found = scan_feed(feed.content, username, last_seen_id, state.recent_ids(username))
+            except etree.XMLSyntaxError as e:
+                logging.warning(f"Failed to parse XML from {instance}: {e}")
+                health.record_failure(instance)
+                continue
+
+            if not ids_found:
+                logging.warning(f"No usable tweets in RSS from {instance}")
+                continue
+
+            # Only a feed that was scanned successfully may short-circuit the next poll
+            feed_validators.update(instance, username, feed.headers, feed.content)
+
+            # Sort by ID descending (newest first)
+            # Note: Tweet IDs are roughly chronological but big integers.
+            candidates.sort(key=_tweet_sort_key, reverse=True)
+
+            if not last_seen_id:
+                # First run: only the latest tweet is needed
+                candidates = candidates[:1]
+
+            new_items = []
+            for candidate in candidates:
                 try:
-                    root = etree.fromstring(response.content)
+                    new_items.append(build_tweet(candidate, username, author_name))
                 except Exception as e:
-                    logging.warning(f"Failed to parse XML from {instance}: {e}")
+                    logging.error(f"Error parsing RSS item: {e}")
                     continue
 
-                items = root.xpath("//item")
-                if not items:
-                    logging.warning(f"No items found in RSS from {instance}")
-                    continue
-                
-                # Extract Channel Title (Author Name)
-                try:
-                    channel_title = root.xpath("//channel/title/text()")
-                    author_name = channel_title[0] if channel_title else username
-                    # Clean up common suffixes in RSSHub/Nitter
-                    author_name = author_name.replace(" / Twitter", "").replace(" / X", "")
-                except Exception:
-                    author_name = username
-                
-                logging.info(f"Found {len(items)} items in RSS feed. Author: {author_name}")
-                
-                # Debug: print first item raw content (Uncomment for deep debugging)
-                # if items:
-                #     try:
-                #         logging.info("--- DEBUG: First Item Raw Content ---")
-                #         # etree.tostring returns bytes, decode to string
-                #         logging.info(etree.tostring(items[0], pretty_print=True).decode('utf-8', errors='ignore'))
-                #         logging.info("-------------------------------------")
-                #     except Exception as e:
-                #         logging.error(f"Failed to print debug info: {e}")
-
-                found_tweets = []
-                
-                for i, item in enumerate(items[:10]): # Check top 10
-                    try:
-                        title = item.xpath("title/text()")[0] if item.xpath("title/text()") else ""
-                        link = item.xpath("link/text()")[0] if item.xpath("link/text()") else ""
-                        description = item.xpath("description/text()")[0] if item.xpath("description/text()") else ""
-                        guid = item.xpath("guid/text()")[0] if item.xpath("guid/text()") else link
-                        
-                        logging.info(f"DEBUG Item {i}: title='{title}', link='{link}'")
-                        logging.info(f"DEBUG Item {i} description raw length: {len(description)}")
-                        
-                        # Extract ID
-                        # RSSHub link format usually: https://twitter.com/user/status/123...
-                        tweet_id = None
-                        if "/status/" in link:
-                            tweet_id = link.split("/status/")[1].split("?")[0]
-                        elif "/status/" in guid:
-                            tweet_id = guid.split("/status/")[1].split("?")[0]
-                        
-                        if not tweet_id:
-                            continue
-
-                        # Extract images from description HTML
-                        images = []
-                        local_images = []
-                        if description:
-                            desc_tree = html.fromstring(description)
-                            img_srcs = desc_tree.xpath("//img/@src")
-                            for src in img_srcs:
-                                # RSSHub sometimes proxies images, sometimes uses original
-                                # Filter out emojis (often from twemoji)
-                                if "twemoji" in src or "emoji" in src:
-                                    continue
-                                images.append(src)
-                                
-                                # Download image
-                                local_path = download_image(src)
-                                if local_path:
-                                    local_images.append(local_path)
-                                
-                        # Clean up title/text (remove HTML tags if any, though title is usually plain text)
-                        # RSSHub title often contains the tweet text
-                        # But sometimes title is truncated. Description usually has full HTML content.
-                        
-                        full_text = title
-                        
-                        if description:
-                            try:
-                                # Use new cleaning function
-                                desc_text = clean_html_content(description)
-                                # If description text is longer than title, or title ends with ..., use description text
-                                if len(desc_text) > len(title) or title.endswith("..."):
-                                    full_text = desc_text
-                            except Exception as e:
-                                logging.warning(f"Failed to extract text from description: {e}")
-                        
-                        if not full_text or full_text == " ":
-                            full_text = title # Fallback
-                        
-                        # Force Twitter link format
-                        # Some RSSHub instances return nitter links or x.com links
-                        # User requested https://twitter.com/
-                        final_link = f"https://twitter.com/{username}/status/{tweet_id}"
-
-                        logging.info(f"DEBUG Item {i} extracted: id={tweet_id}, text='{full_text}'")
-
-                        found_tweets.append({
-                            "id": tweet_id,
-                            "text": full_text,
-                            "images": images,
-                            "local_images": local_images,
-                            "link": final_link,
-                            "author": author_name,
-                            "is_pinned": False 
-                        })
-                    except Exception as e:
-                        logging.error(f"Error parsing RSS item: {e}")
-                        continue
+            if candidates:
+                # Tweets a lagging mirror skipped sit below the watermark: never move it back
+                if not last_seen_id or is_newer_id(candidates[0]["id"], last_seen_id):
+                    save_last_seen_id(username, candidates[0]["id"])
+                state.add_seen_ids(username, [c["id"] for c in candidates])
+                if not last_seen_id:
+                    # First run: return the latest one for testing confirmation
+                    # (it may be days old, so it is flagged to keep it out of breaking-news alerts)
+                    logging.info(f"First run for {username}. Saved latest ID: {candidates[0]['id']}")
+                    for tweet in new_items:
+                        tweet["first_run"] = True
                 
-                if found_tweets:
-                    # Filter logic
-                    # Sort by ID descending (newest first)
-                    # Note: Tweet IDs are roughly chronological but big integers.
-                    found_tweets.sort(key=lambda x: int(x["id"]) if x["id"].isdigit() else x["id"], reverse=True)
-                    
-                    last_seen_id = get_last_seen_id(username)
-                    
-                    if not last_seen_id:
-                        # First run, save the latest ID
-                        latest = found_tweets[0]
-                        save_last_seen_id(username, latest["id"])
-                        logging.info(f"First run for {username}. Saved latest ID: {latest['id']}")
-                        # Return the latest one for testing confirmation
-                        return [latest]
-                    
-                    # Return tweets newer than last_seen_id
-                    new_items = []
-                    for t in found_tweets:
-                        if t["id"].isdigit() and last_seen_id.isdigit():
-                            if int(t["id"]) > int(last_seen_id):
-                                new_items.append(t)
-                        else:
-                            # Fallback string comparison if IDs are not digits (unlikely for Twitter)
-                            if t["id"] > last_seen_id:
-                                new_items.append(t)
-                    
-                    if new_items:
-                        save_last_seen_id(username, new_items[0]["id"])
-                        
-                    return new_items
-                
-        except Exception as e:
-            logging.error(f"Error checking RSSHub instance {instance}: {e}")
-            continue
+            return new_items
             
     logging.error("All RSSHub instances failed.")
     return []
@@ -296,6 +507,7 @@ def check_for_new_tweets(username="realDonaldTrump"):
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     tweets = check_for_new_tweets()
+    state.flush()
     print(f"Found {len(tweets)} tweets")
     if tweets:
         print(tweets[0])
@@ -0,0 +1,88 @@
+"""
+Startup benchmark for the daily email job: imports a script in a fresh
+interpreter with `python -X importtime` and reports the import cost and the
+heaviest modules. Pass another copy of the script (e.g. an older revision saved
+with `git show HEAD~1:street_english_app/daily_email.py > /tmp/daily_email_old.py`)
+to compare.
+
+Usage: python bench_startup.py [script.py ...] [--runs N]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMAIL_DIR = os.path.join(os.path.dirname(BASE_DIR), "email")
+DEFAULT_SCRIPT = os.path.join(BASE_DIR, "daily_email.py")
+HEAVY_MODULES = ("pandas", "numpy", "openai", "resend", "eng_to_ipa", "requests")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)")
+
+def import_once(script):
+    """
+    Import `script` as a module in a new interpreter. Returns (wall seconds,
+    cumulative import microseconds of the script, {direct import: microseconds},
+    set of all top-level packages loaded).
+    """
+    directory, filename = os.path.split(os.path.abspath(script))
+    module = os.path.splitext(filename)[0]
+    code = f"import sys; sys.path[:0] = [{directory!r}, {BASE_DIR!r}, {EMAIL_DIR!r}]; import {module}"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=directory)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {script} failed:\n{proc.stderr[-2000:]}")
+
+    total = 0
+    children = {}
+    pending = {}
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        depth = len(indent) // 2
+        loaded.add(name.split(".")[0])
+        if depth == 0:
+            # Children are reported before their parent
+            if name == module:
+                total, children = int(cumulative), pending
+            pending = {}
+        elif depth == 1:
+            pending[name] = int(cumulative)
+    return wall, total, children, loaded
+
+def report(script, runs):
+    walls = []
+    for _ in range(runs):
+        wall, total, children, loaded = import_once(script)
+        walls.append(wall)
+    print(f"{script}")
+    print(f"  wall time (median of {runs}): {statistics.median(walls) * 1000:.0f} ms, script imports: {total / 1000:.0f} ms")
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    print(f"  heavy modules imported at startup: {', '.join(heavy) if heavy else 'none'}")
+    for name, micros in sorted(children.items(), key=lambda item: -item[1])[:8]:
+        print(f"    {micros / 1000:8.1f} ms  {name}")
+    return statistics.median(walls)
+
+def main():
+    args = sys.argv[1:]
+    runs = 5
+    if "--runs" in args:
+        i = args.index("--runs")
+        runs = int(args[i + 1])
+        del args[i:i + 2]
+    scripts = args or [DEFAULT_SCRIPT]
+
+    results = [(script, report(script, runs)) for script in scripts]
+    if len(results) > 1:
+        baseline = results[-1][1]
+        for script, wall in results[:-1]:
+            print(f"{os.path.basename(script)}: {wall * 1000:.0f} ms vs {baseline * 1000:.0f} ms for {os.path.basename(results[-1][0])}")
+
+if __name__ == "__main__":
+    main()
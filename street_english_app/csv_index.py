@@ -0,0 +1,184 @@
+"""
+Byte-offset row index for a CSV file, so a batch of rows can be read by seeking
+straight to it instead of parsing the whole file.
+
+The index is stored next to the CSV as `<name>.idx`: one JSON line of metadata
+(size, mtime, SHA-256 and row count of the CSV), then the start offset of every
+data row plus the end-of-data offset as little-endian uint64. A lookup reads only
+the metadata and the two offsets it needs. The index is rebuilt when the CSV's
+size changes, or when its mtime changes and the SHA-256 confirms the content did.
+
+The index is committed next to the CSV. A fresh checkout (e.g. the daily GitHub
+Actions run) gives the CSV a new mtime; the index is then confirmed by hashing the
+CSV, which is much cheaper than rescanning it, and is left untouched on disk so the
+tracked file only changes when the CSV does.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+
+# Version 2: quotes only open a quoted field at the start of a field
+INDEX_VERSION = 2
+OFFSET = struct.Struct("<Q")
+# Record boundaries are newlines outside quoted fields; commas mark where fields start
+_BOUNDARY = re.compile(rb'[",\n]')
+_READ_SIZE = 1024 * 1024
+
+def index_path(csv_path):
+    return csv_path + ".idx"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def scan_offsets(path):
+    """
+    Return (end of header, start offsets of the data rows + end offset). Quoted
+    fields may contain newlines; blank lines are skipped like pandas does.
+    Quotes follow the csv module: only a quote at the start of a field opens a
+    quoted field ('3,5" screen' is a literal quote), "" inside one is an escaped
+    quote, and the closing quote may be followed by more unquoted text.
+    """
+    offsets = array("Q")
+    in_quotes = False
+    # Absolute offsets of the current field's first byte and of the last closing quote
+    field_start = 0
+    closed_at = -1
+    record_start = 0
+    header_end = None
+    position = 0
+    previous_byte = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_SIZE), b""):
+            for match in _BOUNDARY.finditer(chunk):
+                char = match.group()
+                offset = position + match.start()
+                if char == b'"':
+                    if in_quotes:
+                        in_quotes = False
+                        closed_at = offset
+                    elif offset == field_start or offset == closed_at + 1:
+                        # Opening quote, or the second half of an escaped ""
+                        in_quotes = True
+                    continue
+                if in_quotes:
+                    continue
+                if char == b",":
+                    field_start = offset + 1
+                    continue
+                end = position + match.end()
+                field_start = end
+                length = end - record_start
+                before = chunk[match.start() - 1:match.start()] if match.start() else previous_byte
+                blank = length == 1 or (length == 2 and before == b"\r")
+                if header_end is None:
+                    header_end = end
+                elif not blank:
+                    offsets.append(record_start)
+                record_start = end
+            position += len(chunk)
+            previous_byte = chunk[-1:]
+    if header_end is None:
+        header_end = position
+    elif position > record_start:
+        # Last row without a trailing newline
+        offsets.append(record_start)
+    offsets.append(position)
+    return header_end, offsets
+
+def _write_index(path, meta, offsets):
+    if sys.byteorder != "little":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".idx", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(meta).encode("ascii") + b"\n")
+            f.write(offsets.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Error saving CSV index {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _read_meta(path):
+    """
+    Return (metadata, byte offset where the offsets start) or (None, 0).
+    """
+    try:
+        with open(path, "rb") as f:
+            line = f.readline()
+        meta = json.loads(line)
+        if meta.get("version") != INDEX_VERSION:
+            return None, 0
+        return meta, len(line)
+    except (OSError, ValueError):
+        return None, 0
+
+def build_index(csv_path):
+    st = os.stat(csv_path)
+    header_end, offsets = scan_offsets(csv_path)
+    meta = {
+        "version": INDEX_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(csv_path),
+        "header_end": header_end,
+        "rows": len(offsets) - 1,
+    }
+    _write_index(index_path(csv_path), meta, offsets)
+    logging.info(f"Indexed {meta['rows']} rows of {csv_path}")
+    return meta
+
+def ensure_index(csv_path):
+    """
+    Return the index metadata for `csv_path`, rebuilding the index if the CSV
+    changed. Unchanged size and mtime are trusted; a changed mtime alone is
+    checked against the stored hash (e.g. after a fresh git checkout). The new
+    mtime is not written back, so the committed index is not rewritten every run.
+    """
+    meta, _ = _read_meta(index_path(csv_path))
+    st = os.stat(csv_path)
+    if meta and meta["size"] == st.st_size:
+        if meta["mtime_ns"] == st.st_mtime_ns or meta["sha256"] == file_sha256(csv_path):
+            return meta
+    return build_index(csv_path)
+
+def _read_offset(f, data_start, row):
+    f.seek(data_start + row * OFFSET.size)
+    return OFFSET.unpack(f.read(OFFSET.size))[0]
+
+def read_rows(csv_path, start, count, encoding="utf-8"):
+    """
+    Read data rows [start, start + count) of `csv_path` via the index.
+    Returns (header, rows, total number of data rows).
+    """
+    meta = ensure_index(csv_path)
+    total = meta["rows"]
+    _, data_start = _read_meta(index_path(csv_path))
+
+    with open(csv_path, "rb") as f:
+        header = next(csv.reader(io.StringIO(f.read(meta["header_end"]).decode(encoding).lstrip("\ufeff"))))
+        if start >= total or count <= 0:
+            return header, [], total
+        with open(index_path(csv_path), "rb") as index:
+            first = _read_offset(index, data_start, start)
+            last = _read_offset(index, data_start, min(start + count, total))
+        f.seek(first)
+        chunk = f.read(last - first).decode(encoding)
+    rows = [row for row in csv.reader(io.StringIO(chunk, newline="")) if row]
+    return header, rows, total
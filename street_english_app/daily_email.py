@@ -1,85 +1,98 @@
 import os
 import json
-import smtplib
-import pandas as pd
+import sys
 import re
+from importlib.util import find_spec
 from email.utils import make_msgid
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from dotenv import load_dotenv
-import eng_to_ipa as ipa
-from openai import OpenAI
 
-try:
-    import resend
-except ImportError:
-    resend = None
+# Heavy optional dependencies (openai, resend, eng_to_ipa) are imported only when
+# they are actually used, so the daily job starts fast.
+
+# Shared keep-alive SMTP pool, subscriber fan-out and HTML renderer live next to the Twitter monitor (stdlib only)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "email"))
+import fanout
+import smtp_pool
+from renderer import HtmlBuilder, Template
+from ipa_cache import IPACache
+import csv_index
 
 def send_email(subject, body_html):
+    """
+    Send the email to every subscriber. Returns True if at least one got it, so a
+    partial failure does not resend the batch to everyone tomorrow.
+    """
+    recipients = fanout.load_recipients(RECEIVER_EMAILS, SUBSCRIBERS_FILE)
+    if not recipients:
+        print("\n[Warning] No recipients configured (RECEIVER_EMAIL / RECEIVER_EMAILS / SUBSCRIBERS_FILE).")
+        return False
+
     # Check if we should use Resend API
     resend_api_key = os.getenv("RESEND_API_KEY")
-    if resend_api_key and resend:
-        return send_email_via_resend(subject, body_html, resend_api_key)
+    if resend_api_key and find_spec("resend"):
+        results = send_email_via_resend(subject, body_html, resend_api_key, recipients)
+    else:
+        results = send_email_via_smtp(subject, body_html, recipients)
+    if results is None:
+        return False
 
+    failed = fanout.failed_recipients(results)
+    print(f"Email delivered to {len(results) - len(failed)}/{len(results)} recipients.")
+    for address in failed:
+        print(f"  Failed: {address}: {results[address]}")
+    return len(failed) < len(results)
+
+def send_email_via_smtp(subject, body_html, recipients):
     # Check for placeholder values or missing values
-    if not all([SMTP_SERVER, SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL]) or "example.com" in SENDER_EMAIL:
+    if not all([SMTP_SERVER, SENDER_EMAIL, SENDER_PASSWORD]) or "example.com" in SENDER_EMAIL:
         print("\n[Warning] Email configuration incomplete or using placeholders.")
         print("Please edit .env to set your real SENDER_EMAIL, SENDER_PASSWORD, etc.")
         print(f"Preview saved to: {DEBUG_PREVIEW_FILE}")
-        return False
+        return None
 
     msg = MIMEMultipart('alternative')
     # Use formataddr to set a display name while keeping the email address
     from email.utils import formataddr
     msg['From'] = formataddr(("Street English App", SENDER_EMAIL))
-    msg['To'] = RECEIVER_EMAIL
     msg['Subject'] = Header(subject, 'utf-8')
 
     msg.attach(MIMEText(body_html, 'html', 'utf-8'))
 
-    try:
-        print(f"Connecting to SMTP server: {SMTP_SERVER}:{SMTP_PORT}...")
-        if SMTP_PORT == 465:
-            server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
-        else:
-            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            server.starttls()
-        
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.sendmail(SENDER_EMAIL, [RECEIVER_EMAIL], msg.as_string())
-        server.quit()
-        print("Email sent successfully!")
-        return True
-    except Exception as e:
-        print(f"Failed to send email via {SMTP_SERVER}:{SMTP_PORT}. Error: {e}")
-        return False
+    print(f"Sending via SMTP server: {SMTP_SERVER}:{SMTP_PORT} to {len(recipients)} recipient(s)...")
+    pool = smtp_pool.get_pool(SMTP_SERVER, SMTP_PORT, SENDER_EMAIL, SENDER_PASSWORD, max_connections=FANOUT_WORKERS)
+    return fanout.send_smtp(
+        pool, msg, SENDER_EMAIL, recipients,
+        workers=FANOUT_WORKERS,
+        limiter=fanout.get_limiter("smtp", SMTP_RATE_LIMIT),
+    )
+
+def send_email_via_resend(subject, body_html, api_key, recipients):
+    import resend
 
-def send_email_via_resend(subject, body_html, api_key):
-    print("Sending email via Resend API...")
+    print(f"Sending email via Resend API to {len(recipients)} recipient(s)...")
     resend.api_key = api_key
     
     # Force the onboarding sender as per user request to restore original look
     sender = "onboarding@resend.dev" 
-    receiver = os.getenv("RECEIVER_EMAIL")
     
     # Add a personal name to the sender
     sender_with_name = f"IELTS <{sender}>"
 
     params = {
         "from": sender_with_name,
-        "to": [receiver],
         "subject": subject,
         "html": body_html,
     }
 
-    try:
-        email = resend.Emails.send(params)
-        print(f"Email sent successfully via Resend! ID: {email.get('id')}")
-        return True
-    except Exception as e:
-        print(f"Failed to send email via Resend API. Error: {e}")
-        return False
+    # No attachments, so recipients go out in batches of up to 100 per API call
+    return fanout.send_resend(
+        resend, params, recipients,
+        workers=FANOUT_WORKERS,
+        limiter=fanout.get_limiter("resend", RESEND_RATE_LIMIT),
+    )
 
 
 
@@ -108,6 +121,12 @@ else:
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
 RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL")
+# Subscribers: RECEIVER_EMAILS (comma separated) plus one address per line in SUBSCRIBERS_FILE
+RECEIVER_EMAILS = [e.strip() for e in os.getenv("RECEIVER_EMAILS", "").split(",") if e.strip()] or ([RECEIVER_EMAIL] if RECEIVER_EMAIL else [])
+SUBSCRIBERS_FILE = os.getenv("SUBSCRIBERS_FILE", os.path.join(BASE_DIR, "subscribers.txt"))
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "4"))
+RESEND_RATE_LIMIT = float(os.getenv("RESEND_RATE_LIMIT", "2"))
+SMTP_RATE_LIMIT = float(os.getenv("SMTP_RATE_LIMIT", "5"))
 
 # OpenAI Config
 API_KEY = os.getenv("OPENAI_API_KEY")
@@ -128,6 +147,7 @@ def generate_phrases(words_list):
         print("Warning: OPENAI_API_KEY not found. Skipping phrase generation.")
         return []
 
+    from openai import OpenAI
     client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
     prompt = f"""
     I have a list of {len(words_list)} English words. 
@@ -189,97 +209,107 @@ def generate_phrases(words_list):
         print(f"Error generating phrases: {e}")
         return []
 
+# Email templates, compiled once (see email/renderer.py for the placeholder syntax)
+PAGE_HEADER = Template("""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">IELTS Daily Vocabulary ({first}-{last})</h2>
+""")
+PAGE_FOOTER = """
+        <p style="font-size: 12px; color: #999; margin-top: 30px; text-align: center;">
+            Generated by Trae AI Street English App<br>
+        </p>
+    </body>
+    </html>
+"""
+WORD_ITEM = Template("""
+        <div style="margin-bottom: 20px; font-family: sans-serif;">
+            <div style="font-size: 18px; font-weight: bold; color: #2c3e50;">{number}. {word}{phonetic:raw}</div>
+            <div style="color: #7f8c8d; font-size: 14px; margin-bottom: 4px;">{pos} {meaning}</div>
+            <div style="color: #34495e; font-size: 15px; margin-top: 6px; font-style: italic;">{sentence}</div>
+            <div style="color: #95a5a6; font-size: 14px; margin-top: 2px;">{sentence_meaning}</div>
+        </div>
+        <hr style="border: 0; border-top: 1px solid #eee; margin: 20px 0;">
+""")
+PHONETIC = Template('<span style="font-weight: normal; font-size: 14px; color: #7f8c8d; margin-left: 8px;">/{phonetic}/</span>')
+PHRASES_HEADER = """
+        <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px; font-family: sans-serif;">
+            <h3 style="color: #2c3e50; margin-top: 0; border-bottom: 1px solid #ddd; padding-bottom: 10px;">Context Phrases</h3>
+            <ul style="padding-left: 20px; color: #34495e; font-size: 15px; line-height: 1.8;">
+"""
+PHRASE_ITEM = Template('<li style="margin-bottom: 10px;"><strong>{english}</strong><br><span style="color: #7f8c8d; font-size: 14px;">{chinese}</span></li>')
+PHRASES_FOOTER = "</ul></div>"
+
+def read_batch(start, count):
+    """
+    Read rows [start, start + count) of the vocabulary CSV, seeking straight to
+    them through the byte-offset index (csv_index). Returns ({column: list of str},
+    total number of rows); empty cells are "".
+    """
+    header, rows, total = csv_index.read_rows(CSV_PATH, start, count)
+    rows = [row + [""] * (len(header) - len(row)) for row in rows]
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(header)}
+    return columns, total
+
 def main():
-    # Load Data
-    df = pd.read_csv(CSV_PATH)
-    
     # Get Progress
     progress = load_progress()
     start_idx = progress["last_index"]
     end_idx = start_idx + BATCH_SIZE
+
+    # Load Data (only the batch rows are kept)
+    batch, total = read_batch(start_idx, BATCH_SIZE)
     
     # Check if we are done
-    if start_idx >= len(df):
+    if start_idx >= total:
         print("All words have been processed!")
         return
-
-    # Get Batch
-    batch = df.iloc[start_idx:end_idx]
     
     # Assemble Email Content
     print("Assembling email content...")
-    email_content = []
+    out = HtmlBuilder()
+    out.add(PAGE_HEADER, first=start_idx+1, last=min(end_idx, total))
     
-    words_for_phrases = []
-
-    for i, row in batch.iterrows():
-        word = row['word']
-        words_for_phrases.append(word)
-        meaning = row['meaning']
-        pos = row['pos']
-        sentence = row.get('sentence', '')
-        if pd.isna(sentence):
-            sentence = ""
-        
-        sentence_meaning = row.get('sentence_meaning', '')
-        if pd.isna(sentence_meaning):
-            sentence_meaning = ""
-        
-        # Generate phonetic transcription
-        try:
-            phonetic = ipa.convert(word)
-        except:
-            phonetic = ""
-        
-        phonetic_html = f'<span style="font-weight: normal; font-size: 14px; color: #7f8c8d; margin-left: 8px;">/{phonetic}/</span>' if phonetic else ""
+    # Columnar render over plain lists: every row is built a whole column at a time
+    words_for_phrases = batch['word']
+    count = len(words_for_phrases)
 
-        item_html = f"""
-        <div style="margin-bottom: 20px; font-family: sans-serif;">
-            <div style="font-size: 18px; font-weight: bold; color: #2c3e50;">{i+1}. {word}{phonetic_html}</div>
-            <div style="color: #7f8c8d; font-size: 14px; margin-bottom: 4px;">{pos} {meaning}</div>
-            <div style="color: #34495e; font-size: 15px; margin-top: 6px; font-style: italic;">{sentence}</div>
-            <div style="color: #95a5a6; font-size: 14px; margin-top: 2px;">{sentence_meaning}</div>
-        </div>
-        <hr style="border: 0; border-top: 1px solid #eee; margin: 20px 0;">
-        """
-        email_content.append(item_html)
+    # Phonetic transcription from the precomputed cache (eng_to_ipa only runs on misses)
+    ipa_cache = IPACache()
+    phonetics = ipa_cache.lookup(words_for_phrases)
+    ipa_cache.save()
+    phonetic_html = [rendered if phonetic else "" for rendered, phonetic in zip(PHONETIC.render_columns(phonetic=phonetics), phonetics)]
+
+    items = WORD_ITEM.render_columns(
+        number=[str(start_idx + 1 + i) for i in range(count)],
+        word=words_for_phrases,
+        phonetic=phonetic_html,
+        pos=batch['pos'],
+        meaning=batch['meaning'],
+        sentence=batch.get('sentence', [""] * count),
+        sentence_meaning=batch.get('sentence_meaning', [""] * count),
+    )
+    out.write("".join(items))
 
     # Generate 10 phrases
     print("Generating phrases...")
     phrases = generate_phrases(words_for_phrases)
-    phrases_html = ""
     if phrases:
-        phrases_html = """
-        <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px; font-family: sans-serif;">
-            <h3 style="color: #2c3e50; margin-top: 0; border-bottom: 1px solid #ddd; padding-bottom: 10px;">Context Phrases</h3>
-            <ul style="padding-left: 20px; color: #34495e; font-size: 15px; line-height: 1.8;">
-        """
+        out.write(PHRASES_HEADER)
         for p in phrases:
-            eng = p.get('english', '')
-            chi = p.get('chinese', '')
-            phrases_html += f'<li style="margin-bottom: 10px;"><strong>{eng}</strong><br><span style="color: #7f8c8d; font-size: 14px;">{chi}</span></li>'
-        phrases_html += "</ul></div>"
+            out.add(PHRASE_ITEM, english=p.get('english', ''), chinese=p.get('chinese', ''))
+        out.write(PHRASES_FOOTER)
 
     # Final Email Body
-    full_body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">IELTS Daily Vocabulary ({start_idx+1}-{min(end_idx, len(df))})</h2>
-        {''.join(email_content)}
-        {phrases_html}
-        <p style="font-size: 12px; color: #999; margin-top: 30px; text-align: center;">
-            Generated by Trae AI Street English App<br>
-        </p>
-    </body>
-    </html>
-    """
+    out.write(PAGE_FOOTER)
+    full_body = out.getvalue()
     
     # Save preview for debugging/user verification
     with open(DEBUG_PREVIEW_FILE, "w") as f:
         f.write(full_body)
     
     # Send Email
-    subject = f"IELTS Daily Vocabulary: Words {start_idx+1}-{min(end_idx, len(df))}"
+    subject = f"IELTS Daily Vocabulary: Words {start_idx+1}-{min(end_idx, total)}"
     if send_email(subject, full_body):
         # Update Progress only if sent successfully
         save_progress(end_idx)
@@ -287,7 +317,6 @@ def main():
         print("Email sending skipped or failed. Progress NOT updated.")
         print(f"You can view the generated content in: {DEBUG_PREVIEW_FILE}")
         # Exit with error code so GitHub Actions knows it failed
-        import sys
         sys.exit(1)
 
 if __name__ == "__main__":
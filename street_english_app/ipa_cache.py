@@ -0,0 +1,80 @@
+"""
+IPA transcriptions for the vocabulary deck, cached in ipa_cache.json (keyed by
+word) so daily runs neither import eng_to_ipa nor repeat its CMU dictionary
+lookups. Words missing from the cache are converted on demand and written back.
+"""
+import os
+import re
+import sys
+
+# Atomic JSON helpers live next to the Twitter monitor (stdlib only)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "email"))
+from storage import atomic_write_json, load_json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IPA_CACHE_FILE = os.path.join(BASE_DIR, "ipa_cache.json")
+
+# Entries such as "food, meal" or "ad/advertisement" list variants: transcribe each
+VARIANT_SEPARATOR = re.compile(r"\s*[,/;]\s*")
+
+def transcribe(word):
+    """
+    Live conversion with eng_to_ipa (imported on first use). Variants are
+    transcribed separately and joined with ", ", dropping repeats (spelling variants
+    such as "disc, disk" sound the same); parts eng_to_ipa does not know (marked
+    with '*') are dropped, so an unknown word gives "".
+    """
+    import eng_to_ipa
+
+    parts = []
+    for variant in VARIANT_SEPARATOR.split(word.strip()):
+        if not variant:
+            continue
+        try:
+            phonetic = eng_to_ipa.convert(variant)
+        except Exception:
+            continue
+        if phonetic and "*" not in phonetic:
+            parts.append(phonetic)
+    return ", ".join(dict.fromkeys(parts))
+
+class IPACache:
+    def __init__(self, path=IPA_CACHE_FILE):
+        self.path = path
+        self.entries = load_json(path, {})
+        self.dirty = False
+
+    def lookup(self, words):
+        """
+        Transcriptions for `words`, in order. Misses are converted and remembered
+        (including words with no transcription, cached as "").
+        """
+        result = []
+        for word in words:
+            phonetic = self.entries.get(word)
+            if phonetic is None:
+                phonetic = self.entries[word] = transcribe(word)
+                self.dirty = True
+            result.append(phonetic)
+        return result
+
+    def refresh(self, words):
+        """
+        Recompute `words` even if cached. Returns the number of changed entries.
+        """
+        changed = 0
+        for word in words:
+            phonetic = transcribe(word)
+            if self.entries.get(word) != phonetic:
+                self.entries[word] = phonetic
+                changed += 1
+        self.dirty = self.dirty or changed > 0
+        return changed
+
+    def save(self):
+        if not self.dirty:
+            return True
+        if atomic_write_json(self.path, self.entries, indent=1):
+            self.dirty = False
+            return True
+        return False
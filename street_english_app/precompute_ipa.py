@@ -0,0 +1,39 @@
+"""
+Fill ipa_cache.json for every word in vocabulary.csv, so the daily email never
+has to load eng_to_ipa. Run after adding words; pass --refresh to recompute
+entries that are already cached.
+"""
+import csv
+import os
+import sys
+import time
+
+from ipa_cache import BASE_DIR, IPACache
+
+CSV_PATH = os.path.join(BASE_DIR, "vocabulary.csv")
+
+def main():
+    refresh = "--refresh" in sys.argv[1:]
+
+    with open(CSV_PATH, newline="", encoding="utf-8") as f:
+        words = [row["word"] for row in csv.DictReader(f) if row.get("word")]
+
+    cache = IPACache()
+    start = time.time()
+    if refresh:
+        changed = cache.refresh(words)
+        print(f"Recomputed {len(words)} words, {changed} changed.")
+    else:
+        before = len(cache.entries)
+        cache.lookup(words)
+        print(f"Cached {len(cache.entries) - before} new words ({len(cache.entries)} total).")
+
+    missing = sum(1 for word in words if not cache.entries.get(word))
+    print(f"{missing} words have no transcription. Took {time.time() - start:.1f}s.")
+
+    if not cache.save():
+        sys.exit(1)
+    print(f"Saved {cache.path}")
+
+if __name__ == "__main__":
+    main()